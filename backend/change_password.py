@@ -2,11 +2,14 @@ import sys
 sys.path.insert(0, '.')
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.pool import NullPool
 import bcrypt
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///sage_ai.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Script ponctuel: une seule connexion, pas de pool
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': NullPool}
 
 db = SQLAlchemy(app)
 
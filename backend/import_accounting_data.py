@@ -4,164 +4,475 @@ Script d'import des données comptables réelles
 """
 
 import csv
+import logging
+import logging.handlers
 import sys
 import os
-from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from queue import Queue
+from threading import Thread
+from functools import lru_cache
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 
+# Import vectorisé si pandas est disponible
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    pd = None
+    PANDAS_AVAILABLE = False
+
 # Ajouter le répertoire src au path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from models.user import db
 from models.accounting_data import BankTransaction, TVAClient
+from utils.db_tuning import enable_bulk_load_pragmas
 from main import app
 
+BANK_CSV_PATH = '/home/ubuntu/upload/banque.csv'
+TVA_CSV_PATH = '/home/ubuntu/upload/déclarationtvacollectéeclientsmai2025.csv'
+CSV_ENCODING = 'iso-8859-1'
+
+# Avertissements (lignes rejetées, valeurs invalides) écrits par paquets dans
+# un fichier au lieu d'un print par ligne
+REJECTS_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_rejects.log')
+REJECTS_LOG_BUFFER = 1024
+logger = logging.getLogger('import')
+
+# Nombre de lignes envoyées par exécution de l'INSERT
+BATCH_SIZE = 10000
+
+# Paquets parsés en attente d'écriture (borne la mémoire des threads lecteurs)
+QUEUE_MAX_BATCHES = 4
+
+# Lignes lues par pandas à chaque itération
+PANDAS_CHUNK_SIZE = 50000
+# Limite historique de paramètres liés par requête SQLite
+SQLITE_MAX_VARIABLES = 999
+
+# Table de traduction pour les décimales à la française
+_COMMA_TO_DOT = str.maketrans(',', '.')
+_ZERO = Decimal('0')
+
+# Partage des valeurs texte courtes et répétées (devise, sens, journal...)
+INTERN_MAX_LENGTH = 32
+INTERN_CACHE_SIZE = 4096
+_interned_values = {}
+
+# Colonnes CSV lues pour chaque modèle: (champ du modèle, en-tête du fichier)
+BANK_COLUMNS = (
+    ('compte_general', 'Compte général'),
+    ('role_tiers', 'Rôle tiers'),
+    ('date_ecriture', 'Date écriture'),
+    ('numero_piece', 'N° pièce'),
+    ('date_reference', 'Date de référence'),
+    ('libelle', 'Libellé'),
+    ('devise', 'Devise'),
+    ('montant_tr', 'Montant TR (MAD)'),
+    ('montant_tc', 'Montant TC'),
+    ('montant_signe_tc', 'Montant signé TC'),
+    ('sens', 'Sens'),
+    ('bq', 'bq'),
+)
+
+# 'Référence pièce' apparaît trois fois dans l'en-tête TVA
+TVA_COLUMNS = (
+    ('code_compte', 'Code Compte'),
+    ('reference_piece', 'Référence pièce'),
+    ('libelle_compte', 'Libellé Compte'),
+    ('reference_piece_2', 'Référence pièce'),
+    ('date_ecriture', 'Date écriture'),
+    ('journal', 'Journal'),
+    ('numero_piece', 'Numéro de pièce'),
+    ('libelle_ecriture', 'Libellé écriture'),
+    ('reference_piece_3', 'Référence pièce'),
+    ('lettrage', 'Lettrage'),
+    ('type_ecriture', 'Type écriture'),
+    ('debit', 'Débit'),
+    ('credit', 'Crédit'),
+    ('solde', 'Solde'),
+)
+
+def setup_rejects_log():
+    """Rediriger les avertissements de l'import vers REJECTS_LOG_PATH via un tampon mémoire"""
+    file_handler = logging.FileHandler(REJECTS_LOG_PATH, mode='w', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    handler = logging.handlers.MemoryHandler(
+        REJECTS_LOG_BUFFER, flushLevel=logging.ERROR, target=file_handler
+    )
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+def close_rejects_log(handler):
+    """Vider le tampon et fermer le fichier des rejets"""
+    file_handler = handler.target
+    logger.removeHandler(handler)
+    handler.close()
+    file_handler.close()
+
+def column_indices(header, columns):
+    """Résout une seule fois la position de chaque colonne dans l'en-tête
+    
+    Les en-têtes répétés sont associés à leurs occurrences successives.
+    """
+    header = [name.strip() for name in header]
+    last_position = {}
+    indices = {}
+    for field, name in columns:
+        try:
+            position = header.index(name, last_position.get(name, -1) + 1)
+        except ValueError:
+            raise ValueError(f"Colonne manquante dans le fichier CSV: {name}")
+        last_position[name] = position
+        indices[field] = position
+    return indices
+
+def clean_text(value, default=None):
+    """Nettoie une valeur texte: rstrip, `default` si vide, instance partagée si courte
+    
+    Les espaces de tête sont déjà retirés par csv.reader(skipinitialspace=True).
+    Le cache est borné à INTERN_CACHE_SIZE entrées; au-delà les nouvelles
+    valeurs sont simplement renvoyées.
+    """
+    value = value.rstrip()
+    if not value:
+        return default
+    if len(value) > INTERN_MAX_LENGTH:
+        return value
+    shared = _interned_values.get(value)
+    if shared is not None:
+        return shared
+    if len(_interned_values) < INTERN_CACHE_SIZE:
+        _interned_values[value] = value
+    return value
+
+# Peu de dates distinctes dans un export comptable: chaque chaîne n'est parsée qu'une fois
+@lru_cache(maxsize=8192)
 def parse_date(date_str):
     """Parse une date au format YYYY-MM-DD"""
-    if not date_str or date_str.strip() == '':
+    if not date_str:
+        return None
+    date_str = date_str.rstrip()
+    if not date_str:
         return None
     try:
-        return datetime.strptime(date_str.strip(), '%Y-%m-%d').date()
+        # Format fixe: découpage direct, strptime seulement pour les cas atypiques
+        if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+            return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]))
+        return datetime.strptime(date_str, '%Y-%m-%d').date()
     except ValueError:
-        print(f"Erreur de format de date: {date_str}")
+        logger.warning("Erreur de format de date: %s", date_str)
         return None
 
 def parse_decimal(value_str):
     """Parse un nombre décimal"""
-    if not value_str or value_str.strip() == '':
-        return Decimal('0')
+    if not value_str:
+        return _ZERO
+    value_str = value_str.rstrip()
+    if not value_str:
+        return _ZERO
     try:
         # Remplacer les virgules par des points pour les décimaux
-        clean_value = value_str.strip().replace(',', '.')
-        return Decimal(clean_value)
+        return Decimal(value_str.translate(_COMMA_TO_DOT))
     except (InvalidOperation, ValueError):
-        print(f"Erreur de format numérique: {value_str}")
-        return Decimal('0')
+        logger.warning("Erreur de format numérique: %s", value_str)
+        return _ZERO
 
-def import_bank_transactions():
-    """Importer les transactions bancaires"""
-    print("Import des transactions bancaires...")
-    
-    file_path = '/home/ubuntu/upload/banque.csv'
+def iter_bank_transactions(reader):
+    """Produire une à une les lignes de transactions bancaires du fichier"""
+    # Extraction de toutes les colonnes en un seul appel C par ligne
+    get_fields = itemgetter(*column_indices(next(reader), BANK_COLUMNS).values())
+    for row in reader:
+        try:
+            (compte_general, role_tiers, date_ecriture, numero_piece, date_reference,
+             libelle, devise, montant_tr, montant_tc, montant_signe_tc, sens, bq) = get_fields(row)
+            # Colonne obligatoire: rejeter la ligne plutôt que faire échouer tout le paquet
+            date_ecriture = parse_date(date_ecriture)
+            if date_ecriture is None:
+                raise ValueError("Date écriture manquante ou invalide")
+            yield {
+                'compte_general': clean_text(compte_general, ''),
+                'role_tiers': clean_text(role_tiers),
+                'date_ecriture': date_ecriture,
+                'numero_piece': clean_text(numero_piece, ''),
+                'date_reference': parse_date(date_reference),
+                'libelle': clean_text(libelle, ''),
+                'devise': clean_text(devise, ''),
+                'montant_tr': parse_decimal(montant_tr),
+                'montant_tc': parse_decimal(montant_tc),
+                'montant_signe_tc': parse_decimal(montant_signe_tc),
+                'sens': clean_text(sens, ''),
+                'bq': parse_decimal(bq)
+            }
+        except Exception as e:
+            logger.warning("Ligne rejetée: %r (%s)", row, e)
+
+def iter_tva_clients(reader):
+    """Produire une à une les lignes TVA clients du fichier"""
+    # Extraction de toutes les colonnes en un seul appel C par ligne
+    get_fields = itemgetter(*column_indices(next(reader), TVA_COLUMNS).values())
+    for row in reader:
+        try:
+            (code_compte, reference_piece, libelle_compte, reference_piece_2, date_ecriture,
+             journal, numero_piece, libelle_ecriture, reference_piece_3, lettrage,
+             type_ecriture, debit, credit, solde) = get_fields(row)
+            yield {
+                'code_compte': clean_text(code_compte, ''),
+                'reference_piece': clean_text(reference_piece),
+                'libelle_compte': clean_text(libelle_compte),
+                'reference_piece_2': clean_text(reference_piece_2),  # 2ème colonne
+                'date_ecriture': parse_date(date_ecriture),
+                'journal': clean_text(journal),
+                'numero_piece': clean_text(numero_piece),
+                'libelle_ecriture': clean_text(libelle_ecriture),
+                'reference_piece_3': clean_text(reference_piece_3),  # 3ème colonne
+                'lettrage': clean_text(lettrage),
+                'type_ecriture': clean_text(type_ecriture),
+                'debit': parse_decimal(debit),
+                'credit': parse_decimal(credit),
+                'solde': parse_decimal(solde)
+            }
+        except Exception as e:
+            logger.warning("Ligne rejetée: %r (%s)", row, e)
+
+def read_csv_batches(file_path, iter_rows, model, label, batches):
+    """Lire et parser un fichier CSV (thread lecteur), en publiant des paquets de lignes
     
+    Une erreur de lecture (fichier illisible, colonne manquante) est publiée
+    telle quelle pour que l'écrivain annule l'import; un `None` est toujours
+    publié en fin de lecture.
+    """
     try:
-        with open(file_path, 'r', encoding='iso-8859-1') as file:
-            # Lire le fichier avec le délimiteur point-virgule
-            reader = csv.DictReader(file, delimiter=';')
-            
-            count = 0
-            for row in reader:
-                try:
-                    transaction = BankTransaction(
-                        compte_general=row.get('Compte général', '').strip(),
-                        role_tiers=row.get('Rôle tiers', '').strip() or None,
-                        date_ecriture=parse_date(row.get('Date écriture', '')),
-                        numero_piece=row.get('N° pièce', '').strip(),
-                        date_reference=parse_date(row.get('Date de référence', '')),
-                        libelle=row.get('Libellé', '').strip(),
-                        devise=row.get('Devise', '').strip(),
-                        montant_tr=parse_decimal(row.get('Montant TR (MAD)', '0')),
-                        montant_tc=parse_decimal(row.get('Montant TC', '0')),
-                        montant_signe_tc=parse_decimal(row.get('Montant signé TC', '0')),
-                        sens=row.get('Sens', '').strip(),
-                        bq=parse_decimal(row.get('bq', '0'))
-                    )
-                    
-                    db.session.add(transaction)
-                    count += 1
-                    
-                    if count % 100 == 0:
-                        db.session.commit()
-                        print(f"Importé {count} transactions bancaires...")
-                        
-                except Exception as e:
-                    print(f"Erreur lors de l'import de la ligne: {row}")
-                    print(f"Erreur: {e}")
-                    continue
-            
-            db.session.commit()
-            print(f"Import terminé: {count} transactions bancaires importées")
-            
+        with open(file_path, 'r', encoding=CSV_ENCODING) as file:
+            # Lire le fichier avec le délimiteur point-virgule (espaces de tête ignorés par le lecteur)
+            reader = csv.reader(file, delimiter=';', skipinitialspace=True)
+            rows = iter_rows(reader)
+            while True:
+                batch = list(islice(rows, BATCH_SIZE))
+                if not batch:
+                    break
+                batches.put((model, label, batch))
     except Exception as e:
-        print(f"Erreur lors de l'ouverture du fichier: {e}")
-        db.session.rollback()
+        logger.error("Erreur lors de la lecture du fichier %s: %s", file_path, e)
+        batches.put(e)
+    finally:
+        batches.put(None)
 
-def import_tva_clients():
-    """Importer les données TVA clients"""
-    print("Import des données TVA clients...")
+def import_csv_files():
+    """Importer tous les fichiers CSV: lectures en parallèle, un seul écrivain
     
-    file_path = '/home/ubuntu/upload/déclarationtvacollectéeclientsmai2025.csv'
+    Repli quand pandas n'est pas installé (voir import_csv_with_pandas).
+    Chaque fichier est lu et parsé dans son propre thread pendant que le thread
+    principal, seul détenteur de la session SQLAlchemy, insère les paquets.
+    Une erreur annule tout l'import puis est propagée.
+    """
+    batches = Queue(maxsize=QUEUE_MAX_BATCHES)
+    readers = [
+        Thread(target=read_csv_batches, args=(*source, batches), daemon=True)
+        for source in CSV_SOURCES
+    ]
+    for reader in readers:
+        reader.start()
     
+    # INSERT Core construits une seule fois (cache de compilation + insertmanyvalues)
+    insert_statements = {model: model.__table__.insert() for _, _, model, _ in CSV_SOURCES}
+    counts = {}
+    remaining = len(readers)
     try:
-        with open(file_path, 'r', encoding='iso-8859-1') as file:
-            # Lire le fichier avec le délimiteur point-virgule
-            reader = csv.DictReader(file, delimiter=';')
-            
-            count = 0
-            for row in reader:
-                try:
-                    tva_client = TVAClient(
-                        code_compte=row.get('Code Compte', '').strip(),
-                        reference_piece=row.get('Référence pièce', '').strip() or None,
-                        libelle_compte=row.get('Libellé Compte', '').strip() or None,
-                        reference_piece_2=row.get('Référence pièce', '').strip() or None,  # 2ème colonne
-                        date_ecriture=parse_date(row.get('Date écriture', '')),
-                        journal=row.get('Journal', '').strip() or None,
-                        numero_piece=row.get('Numéro de pièce', '').strip() or None,
-                        libelle_ecriture=row.get('Libellé écriture', '').strip() or None,
-                        reference_piece_3=row.get('Référence pièce', '').strip() or None,  # 3ème colonne
-                        lettrage=row.get('Lettrage', '').strip() or None,
-                        type_ecriture=row.get('Type écriture', '').strip() or None,
-                        debit=parse_decimal(row.get('Débit', '0')),
-                        credit=parse_decimal(row.get('Crédit', '0')),
-                        solde=parse_decimal(row.get('Solde', '0'))
-                    )
-                    
-                    db.session.add(tva_client)
-                    count += 1
-                    
-                    if count % 100 == 0:
-                        db.session.commit()
-                        print(f"Importé {count} enregistrements TVA...")
-                        
-                except Exception as e:
-                    print(f"Erreur lors de l'import de la ligne: {row}")
-                    print(f"Erreur: {e}")
-                    continue
-            
-            db.session.commit()
-            print(f"Import terminé: {count} enregistrements TVA importés")
+        clear_import_tables(db.session)
+        while remaining:
+            item = batches.get()
+            if item is None:
+                remaining -= 1
+                continue
+            if isinstance(item, Exception):
+                # Lecture d'un fichier en échec: rien n'est validé
+                raise item
+            model, label, batch = item
+            db.session.execute(insert_statements[model], batch)
+            counts[label] = counts.get(label, 0) + len(batch)
+            print(f"Importé {counts[label]} {label}...")
+        
+        # Une seule transaction pour tous les fichiers
+        db.session.commit()
+        for label, count in counts.items():
+            print(f"Import terminé: {count} {label} importés")
             
     except Exception as e:
-        print(f"Erreur lors de l'ouverture du fichier: {e}")
+        print(f"Erreur lors de l'import: {e}")
         db.session.rollback()
+        raise
+
+def parse_decimal_column(values, label):
+    """Convertir une colonne de montants texte (virgule décimale) en float, 0 si vide ou invalide"""
+    values = values.fillna('')
+    numbers = pd.to_numeric(values.str.replace(',', '.', regex=False), errors='coerce')
+    invalid = numbers.isna() & (values != '')
+    if invalid.any():
+        logger.warning("%d montants invalides dans %s remplacés par 0: %s",
+                       invalid.sum(), label, ', '.join(values[invalid].unique()[:10]))
+    return numbers.fillna(0.0)
+
+def read_csv_chunks(file_path, idx, decimal_fields, typed_decimals):
+    """Lire par paquets, par position, les colonnes idx d'un fichier CSV (en-tête ignoré)
+    
+    Avec typed_decimals, les montants (virgule décimale) sont convertis en
+    float64 directement par le tokenizer C de pandas; sinon tout est lu en texte.
+    """
+    positions = sorted(set(idx.values()))
+    decimal_positions = {idx[field] for field in decimal_fields} if typed_decimals else set()
+    return pd.read_csv(
+        file_path, sep=';', encoding=CSV_ENCODING, header=None, skiprows=1,
+        usecols=positions,
+        dtype={position: 'float64' if position in decimal_positions else str for position in positions},
+        decimal=',', keep_default_na=False,
+        na_values={position: [''] for position in decimal_positions},
+        chunksize=PANDAS_CHUNK_SIZE
+    )
+
+def load_csv_chunks(connection, file_path, model, idx, date_fields, decimal_fields, nullable_fields,
+                    required_fields, typed_decimals):
+    """Convertir et insérer un fichier CSV paquet par paquet (voir import_csv_with_pandas)
+    
+    Les paquets sont insérés sur connection, dans sa transaction: to_sql ne
+    valide rien lui-même quand une transaction est déjà ouverte.
+    """
+    fields = list(idx)
+    chunks = read_csv_chunks(file_path, idx, decimal_fields, typed_decimals)
+    # Un INSERT multi-lignes ne doit pas dépasser la limite de paramètres SQLite
+    rows_per_insert = SQLITE_MAX_VARIABLES // (len(fields) + 1)
+    
+    count = 0
+    for chunk in chunks:
+        # Champs absents des lignes courtes: NaN, rejetés via required_fields
+        df = pd.DataFrame({
+            field: chunk[idx[field]] if typed_decimals and field in decimal_fields
+            else chunk[idx[field]].str.strip()
+            for field in fields
+        })
+        for field in decimal_fields:
+            if typed_decimals:
+                df[field] = df[field].fillna(0.0)
+            else:
+                df[field] = parse_decimal_column(df[field], f"{model.__tablename__}.{field}")
+        for field in date_fields:
+            df[field] = pd.to_datetime(df[field], format='%Y-%m-%d', errors='coerce').dt.date
+        df = df.astype(object).where(df.notna(), None)
+        for field in nullable_fields:
+            df[field] = df[field].where(df[field] != '', None)
+        if required_fields:
+            rejected = df[list(required_fields)].isna().any(axis=1)
+            if rejected.any():
+                logger.warning("%d lignes rejetées dans %s: colonne obligatoire vide ou invalide (%s)",
+                               rejected.sum(), model.__tablename__, ', '.join(required_fields))
+                df = df[~rejected]
+        # to_sql n'applique pas les valeurs par défaut Python du modèle
+        df['created_at'] = datetime.utcnow()
+        
+        df.to_sql(model.__tablename__, connection, if_exists='append', index=False,
+                  method='multi', chunksize=rows_per_insert)
+        count += len(df)
+        print(f"Importé {count} lignes dans {model.__tablename__}...")
+    return count
+
+def import_csv_with_pandas(connection, file_path, model, columns, date_fields, decimal_fields, nullable_fields,
+                           required_fields=()):
+    """Importer un fichier CSV avec le parseur C de pandas et des INSERT multi-lignes
+    
+    Les lignes sont insérées dans la transaction de connection, validée par
+    l'appelant; une erreur est propagée (rien n'est alors validé).
+    Les colonnes sont résolues par position (comme pour csv.reader) afin de
+    conserver les en-têtes répétés du fichier TVA. Les montants sont d'abord
+    convertis par le tokenizer C; si l'un d'eux n'est pas numérique, les lignes
+    déjà insérées sont supprimées et le fichier relu en texte pour que seules
+    les valeurs invalides soient remplacées par 0.
+    """
+    print(f"Import vectorisé de {file_path}...")
+    
+    with open(file_path, 'r', encoding=CSV_ENCODING) as file:
+        header = next(csv.reader(file, delimiter=';'))
+    idx = column_indices(header, columns)
+    options = dict(date_fields=date_fields, decimal_fields=decimal_fields,
+                   nullable_fields=nullable_fields, required_fields=required_fields)
+    
+    try:
+        count = load_csv_chunks(connection, file_path, model, idx, typed_decimals=True, **options)
+    except ValueError:
+        logger.warning("Montants non numériques dans %s: relecture en texte", file_path)
+        # Repartir d'une table vide (même transaction)
+        connection.execute(model.__table__.delete())
+        count = load_csv_chunks(connection, file_path, model, idx, typed_decimals=False, **options)
+    
+    print(f"Import terminé: {count} lignes importées dans {model.__tablename__}")
+
+def clear_import_tables(connection):
+    """Vider les tables importées, dans la transaction en cours (connexion ou session)"""
+    print("Suppression des données existantes...")
+    for _, _, model, _ in CSV_SOURCES:
+        connection.execute(model.__table__.delete())
+
+# Fichiers lus par import_csv_files: (chemin, générateur de lignes, modèle, libellé)
+CSV_SOURCES = (
+    (BANK_CSV_PATH, iter_bank_transactions, BankTransaction, 'transactions bancaires'),
+    (TVA_CSV_PATH, iter_tva_clients, TVAClient, 'enregistrements TVA'),
+)
 
 def main():
     """Fonction principale d'import"""
     print("Début de l'import des données comptables réelles...")
     
-    with app.app_context():
-        # Créer les tables si elles n'existent pas
-        db.create_all()
-        
-        # Vider les tables existantes
-        print("Suppression des données existantes...")
-        BankTransaction.query.delete()
-        TVAClient.query.delete()
-        db.session.commit()
-        
-        # Importer les données
-        import_bank_transactions()
-        import_tva_clients()
-        
-        # Afficher les statistiques
-        bank_count = BankTransaction.query.count()
-        tva_count = TVAClient.query.count()
-        
-        print(f"\n=== IMPORT TERMINÉ ===")
-        print(f"Transactions bancaires: {bank_count}")
-        print(f"Enregistrements TVA: {tva_count}")
-        print(f"Total: {bank_count + tva_count} enregistrements")
+    rejects_log = setup_rejects_log()
+    try:
+        with app.app_context():
+            # Pas de fsync par commit pendant le chargement
+            enable_bulk_load_pragmas(db.engine)
+            
+            # Créer les tables si elles n'existent pas
+            db.create_all()
+            
+            # Vider les tables puis importer les deux fichiers dans une seule
+            # transaction: en cas d'échec, les données précédentes restent en place
+            if PANDAS_AVAILABLE:
+                with db.engine.begin() as connection:
+                    clear_import_tables(connection)
+                    import_csv_with_pandas(
+                        connection, BANK_CSV_PATH, BankTransaction, BANK_COLUMNS,
+                        date_fields=('date_ecriture', 'date_reference'),
+                        decimal_fields=('montant_tr', 'montant_tc', 'montant_signe_tc', 'bq'),
+                        nullable_fields=('role_tiers',),
+                        required_fields=('compte_general', 'date_ecriture', 'numero_piece',
+                                         'libelle', 'devise', 'sens')
+                    )
+                    import_csv_with_pandas(
+                        connection, TVA_CSV_PATH, TVAClient, TVA_COLUMNS,
+                        date_fields=('date_ecriture',),
+                        decimal_fields=('debit', 'credit', 'solde'),
+                        nullable_fields=('reference_piece', 'libelle_compte', 'reference_piece_2',
+                                         'journal', 'numero_piece', 'libelle_ecriture',
+                                         'reference_piece_3', 'lettrage', 'type_ecriture'),
+                        required_fields=('code_compte',)
+                    )
+            else:
+                # Repli sans pandas
+                import_csv_files()
+            
+            # Afficher les statistiques
+            bank_count = BankTransaction.query.count()
+            tva_count = TVAClient.query.count()
+            
+            print(f"\n=== IMPORT TERMINÉ ===")
+            print(f"Transactions bancaires: {bank_count}")
+            print(f"Enregistrements TVA: {tva_count}")
+            print(f"Total: {bank_count + tva_count} enregistrements")
+            print(f"Lignes rejetées et valeurs invalides: voir {REJECTS_LOG_PATH}")
+    finally:
+        close_rejects_log(rejects_log)
+
 
 if __name__ == '__main__':
     main()
@@ -8,6 +8,9 @@ import os
 # Ajouter le répertoire src au path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+# Script ponctuel: moteur sans pool de connexions
+os.environ.setdefault('SQLALCHEMY_NULL_POOL', '1')
+
 from src.main import app
 from src.models.user import db
 
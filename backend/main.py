@@ -2,6 +2,7 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import exists, select
 import bcrypt
 import os
 
@@ -15,19 +16,28 @@ CORS(app)
 jwt = JWTManager(app)
 db = SQLAlchemy(app)
 
+# Coût bcrypt réduit pour les utilisateurs de test uniquement
+TEST_BCRYPT_ROUNDS = 4
+
 # User model
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, index=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     name = db.Column(db.String(100), nullable=False)
 
-    def set_password(self, password):
-        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    def set_password(self, password, rounds=12):
+        self.password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
 
     def check_password(self, password):
         return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
 
+def find_login_row(email):
+    """Lookup indexé (id, password_hash, name) sans instancier d'objet ORM"""
+    return db.session.execute(
+        select(User.id, User.password_hash, User.name).where(User.email == email)
+    ).first()
+
 # Routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -37,7 +47,7 @@ def health_check():
 def register():
     data = request.get_json()
     
-    if User.query.filter_by(email=data['email']).first():
+    if db.session.query(exists().where(User.email == data['email'])).scalar():
         return jsonify({"error": "Email already exists"}), 400
     
     user = User(email=data['email'], name=data['name'])
@@ -52,11 +62,11 @@ def register():
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
-    user = User.query.filter_by(email=data['email']).first()
+    row = find_login_row(data['email'])
     
-    if user and user.check_password(data['password']):
-        access_token = create_access_token(identity=user.id)
-        return jsonify({"access_token": access_token, "user": {"id": user.id, "email": user.email, "name": user.name}})
+    if row and bcrypt.checkpw(data['password'].encode('utf-8'), row.password_hash.encode('utf-8')):
+        access_token = create_access_token(identity=row.id)
+        return jsonify({"access_token": access_token, "user": {"id": row.id, "email": data['email'], "name": row.name}})
     
     return jsonify({"error": "Invalid credentials"}), 401
 
@@ -85,7 +95,7 @@ if __name__ == '__main__':
         # Create test user if not exists
         if not User.query.filter_by(email='test@example.com').first():
             test_user = User(email='test@example.com', name='Test User')
-            test_user.set_password('password123')
+            test_user.set_password('password123', rounds=TEST_BCRYPT_ROUNDS)
             db.session.add(test_user)
             db.session.commit()
     
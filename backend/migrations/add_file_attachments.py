@@ -3,6 +3,11 @@ Migration pour ajouter la table des fichiers attachés
 Exécuter avec: python migrations/add_file_attachments.py
 """
 
+import os
+
+# Script ponctuel: moteur sans pool de connexions
+os.environ.setdefault('SQLALCHEMY_NULL_POOL', '1')
+
 from src.models.user import db, FileAttachment
 from src.main import app
 
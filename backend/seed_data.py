@@ -4,14 +4,33 @@ Script pour initialiser la base de données avec des données de test
 """
 import sys
 import os
-import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
 
 # Ajouter le répertoire src au path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.main import app
 from src.models.user import db, User, Conversation, SageOperation, AutomationRule, AuditLog
+from src.utils.db_tuning import enable_bulk_load_pragmas
+from src.utils.json_utils import json_dumps
+
+# Hachage allégé pour les comptes de démonstration (jamais en production)
+SEED_PASSWORD_METHOD = 'pbkdf2:sha256:1000'
+
+# Modèles réinitialisés par seed_database
+SEED_MODELS = (User, Conversation, SageOperation, AutomationRule, AuditLog)
+
+def hash_seed_passwords(passwords):
+    """Hacher une seule fois chaque mot de passe distinct, en parallèle"""
+    distinct_passwords = list(dict.fromkeys(passwords))
+    with ThreadPoolExecutor() as executor:
+        hashes = executor.map(
+            lambda password: generate_password_hash(password, method=SEED_PASSWORD_METHOD),
+            distinct_passwords
+        )
+        return dict(zip(distinct_passwords, hashes))
 
 def create_test_users():
     """Créer des utilisateurs de test"""
@@ -33,17 +52,20 @@ def create_test_users():
         }
     ]
     
-    created_users = []
-    for user_data in users_data:
-        user = User(
+    password_hashes = hash_seed_passwords(user_data['password'] for user_data in users_data)
+    
+    created_users = [
+        User(
             username=user_data['username'],
-            email=user_data['email']
+            email=user_data['email'],
+            password_hash=password_hashes[user_data['password']]
         )
-        user.set_password(user_data['password'])
-        db.session.add(user)
-        created_users.append(user)
+        for user_data in users_data
+    ]
+    db.session.add_all(created_users)
     
-    db.session.commit()
+    # flush pour obtenir les ids; le commit est fait une seule fois par seed_database
+    db.session.flush()
     return created_users
 
 def create_test_conversations(users):
@@ -55,13 +77,13 @@ def create_test_conversations(users):
                 {
                     'role': 'user',
                     'content': 'Peux-tu analyser mon bilan comptable du mois dernier ?',
-                    'timestamp': (datetime.utcnow() - timedelta(hours=2)).isoformat(),
+                    'timestamp': datetime.utcnow() - timedelta(hours=2),
                     'metadata': {}
                 },
                 {
                     'role': 'assistant',
                     'content': 'Bien sûr ! Je vais analyser votre bilan comptable. Pouvez-vous me fournir les données ou me donner accès à votre compte Sage ?',
-                    'timestamp': (datetime.utcnow() - timedelta(hours=2, minutes=1)).isoformat(),
+                    'timestamp': datetime.utcnow() - timedelta(hours=2, minutes=1),
                     'metadata': {}
                 }
             ]
@@ -72,13 +94,13 @@ def create_test_conversations(users):
                 {
                     'role': 'user',
                     'content': 'Comment puis-je automatiser la création de factures récurrentes ?',
-                    'timestamp': (datetime.utcnow() - timedelta(hours=1)).isoformat(),
+                    'timestamp': datetime.utcnow() - timedelta(hours=1),
                     'metadata': {}
                 },
                 {
                     'role': 'assistant',
                     'content': 'Je peux vous aider à configurer des règles d\'automatisation pour les factures récurrentes. Voici les étapes...',
-                    'timestamp': (datetime.utcnow() - timedelta(hours=1, minutes=2)).isoformat(),
+                    'timestamp': datetime.utcnow() - timedelta(hours=1, minutes=2),
                     'metadata': {}
                 }
             ]
@@ -89,23 +111,22 @@ def create_test_conversations(users):
                 {
                     'role': 'user',
                     'content': 'Génère-moi un rapport financier complet pour le mois de août',
-                    'timestamp': datetime.utcnow().isoformat(),
+                    'timestamp': datetime.utcnow(),
                     'metadata': {}
                 }
             ]
         }
     ]
     
-    for i, conv_data in enumerate(conversations_data):
-        user = users[i % len(users)]  # Distribuer les conversations entre les utilisateurs
-        conversation = Conversation(
-            user_id=user.id,
+    # Distribuer les conversations entre les utilisateurs
+    db.session.add_all([
+        Conversation(
+            user_id=users[i % len(users)].id,
             title=conv_data['title'],
-            messages=json.dumps(conv_data['messages'], ensure_ascii=False)
+            messages=json_dumps(conv_data['messages'])
         )
-        db.session.add(conversation)
-    
-    db.session.commit()
+        for i, conv_data in enumerate(conversations_data)
+    ])
 
 def create_test_sage_operations(users):
     """Créer des opérations Sage de test"""
@@ -130,6 +151,7 @@ def create_test_sage_operations(users):
         }
     ]
     
+    operations = []
     for i, op_data in enumerate(operations_data):
         user = users[i % len(users)]
         operation = SageOperation(
@@ -140,10 +162,9 @@ def create_test_sage_operations(users):
         operation.set_operation_data(op_data['operation_data'])
         if op_data['sage_response']:
             operation.set_sage_response(op_data['sage_response'])
-        
-        db.session.add(operation)
+        operations.append(operation)
     
-    db.session.commit()
+    db.session.add_all(operations)
 
 def create_test_automation_rules(users):
     """Créer des règles d'automatisation de test"""
@@ -170,6 +191,7 @@ def create_test_automation_rules(users):
         }
     ]
     
+    rules = []
     for i, rule_data in enumerate(rules_data):
         user = users[i % len(users)]
         rule = AutomationRule(
@@ -178,10 +200,9 @@ def create_test_automation_rules(users):
             description=rule_data['description']
         )
         rule.set_rule_config(rule_data['rule_config'])
-        
-        db.session.add(rule)
+        rules.append(rule)
     
-    db.session.commit()
+    db.session.add_all(rules)
 
 def create_test_audit_logs(users):
     """Créer des logs d'audit de test"""
@@ -203,6 +224,7 @@ def create_test_audit_logs(users):
         }
     ]
     
+    audit_logs = []
     for i, log_data in enumerate(logs_data):
         user = users[i % len(users)]
         audit_log = AuditLog(
@@ -212,23 +234,20 @@ def create_test_audit_logs(users):
             user_agent=log_data.get('user_agent', 'Test Agent')
         )
         audit_log.set_details(log_data['details'])
-        
-        db.session.add(audit_log)
+        audit_logs.append(audit_log)
     
-    db.session.commit()
+    db.session.add_all(audit_logs)
 
 def seed_database():
     """Initialiser la base de données avec des données de test"""
     with app.app_context():
+        enable_bulk_load_pragmas(db.engine)
         try:
             print("🗑️  Suppression des données existantes...")
-            # Supprimer toutes les données existantes
-            db.session.query(AuditLog).delete()
-            db.session.query(AutomationRule).delete()
-            db.session.query(SageOperation).delete()
-            db.session.query(Conversation).delete()
-            db.session.query(User).delete()
-            db.session.commit()
+            # Recréer les tables plutôt que supprimer les lignes une à une
+            seed_tables = [model.__table__ for model in SEED_MODELS]
+            db.metadata.drop_all(bind=db.engine, tables=seed_tables)
+            db.metadata.create_all(bind=db.engine, tables=seed_tables)
             
             print("👥 Création des utilisateurs de test...")
             users = create_test_users()
@@ -250,6 +269,9 @@ def seed_database():
             create_test_audit_logs(users)
             print("   ✅ Logs d'audit créés")
             
+            # Une seule transaction pour tout le jeu de données
+            db.session.commit()
+            
             print("\n🎉 Base de données initialisée avec succès avec des données de test !")
             print("\n📋 Utilisateurs de test créés :")
             for user in users:
@@ -4,193 +4,495 @@ Script d'import simplifié des données comptables
 """
 
 import csv
+import io
+import logging
+import logging.handlers
+import os
 import sqlite3
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
+from operator import itemgetter
 from decimal import Decimal, InvalidOperation
 
+# Import vectorisé si pandas est disponible
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    pd = None
+    PANDAS_AVAILABLE = False
+
+# Conversion des montants sans exception Python si fastnumbers est disponible
+try:
+    from fastnumbers import try_float
+    FASTNUMBERS_AVAILABLE = True
+except ImportError:
+    try_float = None
+    FASTNUMBERS_AVAILABLE = False
+
+CSV_ENCODING = 'iso-8859-1'
+# Tampon de lecture brut (1 Mo) : moins d'appels système sur les gros exports
+CSV_READ_BUFFER = 1 << 20
+
+# Avertissements (lignes rejetées, valeurs invalides) écrits par paquets dans
+# un fichier au lieu d'un print par ligne
+REJECTS_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_rejects.log')
+REJECTS_LOG_BUFFER = 1024
+logger = logging.getLogger('import')
+
+# Table de traduction pour les décimales à la française
+_COMMA_TO_DOT = str.maketrans(',', '.')
+
+# PRAGMAs de chargement en masse: pas de fsync par commit (une coupure
+# pendant l'import peut corrompre la base, il suffit alors de relancer le
+# script), verrou exclusif et cache de 200 Mo en mémoire. Ils ne valent que
+# pour la connexion; pas de journal_mode=WAL, qui resterait inscrit dans le
+# fichier de la base de l'application
+BULK_LOAD_PRAGMAS = (
+    'synchronous=OFF',
+    'temp_store=MEMORY',
+    'cache_size=-200000',
+    'locking_mode=EXCLUSIVE',
+    'mmap_size=268435456',
+)
+
+# Lignes lues par pandas à chaque itération (borne la mémoire)
+PANDAS_CHUNK_SIZE = 50000
+
+# Colonnes CSV lues pour chaque table: (colonne SQL, en-tête du fichier)
+BANK_COLUMNS = (
+    ('compte_general', 'Compte général'),
+    ('role_tiers', 'Rôle tiers'),
+    ('date_ecriture', 'Date écriture'),
+    ('numero_piece', 'N° pièce'),
+    ('date_reference', 'Date de référence'),
+    ('libelle', 'Libellé'),
+    ('devise', 'Devise'),
+    ('montant_tr', 'Montant TR (MAD)'),
+    ('montant_tc', 'Montant TC'),
+    ('montant_signe_tc', 'Montant signé TC'),
+    ('sens', 'Sens'),
+    ('bq', 'bq'),
+)
+
+# 'Référence pièce' apparaît trois fois dans l'en-tête TVA
+TVA_COLUMNS = (
+    ('code_compte', 'Code Compte'),
+    ('reference_piece', 'Référence pièce'),
+    ('libelle_compte', 'Libellé Compte'),
+    ('reference_piece_2', 'Référence pièce'),
+    ('date_ecriture', 'Date écriture'),
+    ('journal', 'Journal'),
+    ('numero_piece', 'Numéro de pièce'),
+    ('libelle_ecriture', 'Libellé écriture'),
+    ('reference_piece_3', 'Référence pièce'),
+    ('lettrage', 'Lettrage'),
+    ('type_ecriture', 'Type écriture'),
+    ('debit', 'Débit'),
+    ('credit', 'Crédit'),
+    ('solde', 'Solde'),
+)
+
+INSERT_BANK_TRANSACTION_SQL = '''
+    INSERT INTO bank_transactions 
+    (compte_general, role_tiers, date_ecriture, numero_piece, date_reference, 
+     libelle, devise, montant_tr, montant_tc, montant_signe_tc, sens, bq)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+INSERT_TVA_CLIENT_SQL = '''
+    INSERT INTO tva_clients 
+    (code_compte, reference_piece, libelle_compte, reference_piece_2, date_ecriture,
+     journal, numero_piece, libelle_ecriture, reference_piece_3, lettrage,
+     type_ecriture, debit, credit, solde)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Tables alimentées par l'import, créées en un seul script
+IMPORT_TABLES = ('bank_transactions', 'tva_clients')
+
+SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS bank_transactions (
+        id INTEGER PRIMARY KEY,
+        compte_general VARCHAR(20) NOT NULL,
+        role_tiers VARCHAR(100),
+        date_ecriture DATE NOT NULL,
+        numero_piece VARCHAR(50) NOT NULL,
+        date_reference DATE,
+        libelle TEXT NOT NULL,
+        devise VARCHAR(10) NOT NULL,
+        montant_tr DECIMAL(15,2) NOT NULL,
+        montant_tc DECIMAL(15,2) NOT NULL,
+        montant_signe_tc DECIMAL(15,2) NOT NULL,
+        sens VARCHAR(10) NOT NULL,
+        bq DECIMAL(15,2),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS tva_clients (
+        id INTEGER PRIMARY KEY,
+        code_compte VARCHAR(20) NOT NULL,
+        reference_piece VARCHAR(50),
+        libelle_compte VARCHAR(200),
+        reference_piece_2 VARCHAR(50),
+        date_ecriture DATE,
+        journal VARCHAR(20),
+        numero_piece VARCHAR(50),
+        libelle_ecriture TEXT,
+        reference_piece_3 VARCHAR(50),
+        lettrage VARCHAR(20),
+        type_ecriture VARCHAR(10),
+        debit DECIMAL(15,2) DEFAULT 0,
+        credit DECIMAL(15,2) DEFAULT 0,
+        solde DECIMAL(15,2) DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+# Peu de dates distinctes dans un export comptable: chaque chaîne n'est parsée qu'une fois
+@lru_cache(maxsize=8192)
 def parse_date(date_str):
     """Parse une date au format YYYY-MM-DD"""
-    if not date_str or date_str.strip() == '':
+    if not date_str:
+        return None
+    date_str = date_str.strip()
+    if not date_str:
         return None
     try:
-        return datetime.strptime(date_str.strip(), '%Y-%m-%d').date().isoformat()
+        # Format fixe: découpage direct, strptime seulement pour les cas atypiques
+        if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+            return date(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10])).isoformat()
+        return datetime.strptime(date_str, '%Y-%m-%d').date().isoformat()
     except ValueError:
-        print(f"Erreur de format de date: {date_str}")
+        logger.warning("Erreur de format de date: %s", date_str)
         return None
 
 def parse_decimal(value_str):
     """Parse un nombre décimal"""
-    if not value_str or value_str.strip() == '':
+    if not value_str:
+        return 0.0
+    if FASTNUMBERS_AVAILABLE:
+        # try_float ignore les espaces autour du nombre
+        value = try_float(value_str.translate(_COMMA_TO_DOT) if ',' in value_str else value_str,
+                          on_fail=None)
+        if value is not None:
+            return value
+    value_str = value_str.strip()
+    if not value_str:
         return 0.0
     try:
         # Remplacer les virgules par des points pour les décimaux
-        clean_value = value_str.strip().replace(',', '.')
-        return float(clean_value)
+        return float(value_str.translate(_COMMA_TO_DOT))
     except (ValueError, InvalidOperation):
-        print(f"Erreur de format numérique: {value_str}")
+        logger.warning("Erreur de format numérique: %s", value_str)
         return 0.0
 
-def create_tables(conn):
-    """Créer les tables si elles n'existent pas"""
-    cursor = conn.cursor()
+def open_csv(file_path):
+    """Ouvrir un CSV en lecture binaire tamponnée, décodé en une seule passe"""
+    raw = open(file_path, 'rb', buffering=CSV_READ_BUFFER)
+    return io.TextIOWrapper(raw, encoding=CSV_ENCODING, newline='')
+
+def setup_rejects_log():
+    """Rediriger les avertissements de l'import vers REJECTS_LOG_PATH via un tampon mémoire"""
+    file_handler = logging.FileHandler(REJECTS_LOG_PATH, mode='w', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+    handler = logging.handlers.MemoryHandler(
+        REJECTS_LOG_BUFFER, flushLevel=logging.ERROR, target=file_handler
+    )
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return handler
+
+def close_rejects_log(handler):
+    """Vider le tampon et fermer le fichier des rejets"""
+    file_handler = handler.target
+    logger.removeHandler(handler)
+    handler.close()
+    file_handler.close()
+
+def column_indices(header, columns):
+    """Associer chaque colonne SQL à sa position dans l'en-tête CSV
     
-    # Table des transactions bancaires
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS bank_transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            compte_general VARCHAR(20) NOT NULL,
-            role_tiers VARCHAR(100),
-            date_ecriture DATE NOT NULL,
-            numero_piece VARCHAR(50) NOT NULL,
-            date_reference DATE,
-            libelle TEXT NOT NULL,
-            devise VARCHAR(10) NOT NULL,
-            montant_tr DECIMAL(15,2) NOT NULL,
-            montant_tc DECIMAL(15,2) NOT NULL,
-            montant_signe_tc DECIMAL(15,2) NOT NULL,
-            sens VARCHAR(10) NOT NULL,
-            bq DECIMAL(15,2),
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    Un en-tête répété est associé à ses occurrences successives.
+    """
+    stripped_header = [name.strip() for name in header]
+    indices = {}
+    start_positions = {}
+    for column, name in columns:
+        try:
+            position = stripped_header.index(name, start_positions.get(name, 0))
+        except ValueError:
+            raise ValueError(f"Colonne manquante dans le fichier CSV: {name}")
+        indices[column] = position
+        start_positions[name] = position + 1
+    return indices
+
+def iter_bank_transactions(reader):
+    """Produire une à une les lignes de transactions bancaires du fichier"""
+    # Positions des colonnes résolues une seule fois depuis l'en-tête
+    get_fields = itemgetter(*column_indices(next(reader), BANK_COLUMNS).values())
+    for row in reader:
+        # Les lignes invalides sont écartées avant l'insertion
+        try:
+            (compte_general, role_tiers, date_ecriture, numero_piece, date_reference,
+             libelle, devise, montant_tr, montant_tc, montant_signe_tc, sens, bq) = get_fields(row)
+            # Colonne NOT NULL: rejeter la ligne plutôt que faire échouer tout l'import
+            date_ecriture = parse_date(date_ecriture)
+            if date_ecriture is None:
+                raise ValueError("Date écriture manquante ou invalide")
+            yield (
+                compte_general.strip(),
+                role_tiers.strip() or None,
+                date_ecriture,
+                numero_piece.strip(),
+                parse_date(date_reference),
+                libelle.strip(),
+                devise.strip(),
+                parse_decimal(montant_tr),
+                parse_decimal(montant_tc),
+                parse_decimal(montant_signe_tc),
+                sens.strip(),
+                parse_decimal(bq)
+            )
+        except Exception as e:
+            logger.warning("Ligne rejetée: %r (%s)", row, e)
+
+def iter_tva_clients(reader):
+    """Produire une à une les lignes TVA clients du fichier"""
+    # Positions des colonnes résolues une seule fois depuis l'en-tête
+    # ('Référence pièce' y figure trois fois)
+    get_fields = itemgetter(*column_indices(next(reader), TVA_COLUMNS).values())
+    for row in reader:
+        # Les lignes invalides sont écartées avant l'insertion
+        try:
+            (code_compte, reference_piece, libelle_compte, reference_piece_2, date_ecriture,
+             journal, numero_piece, libelle_ecriture, reference_piece_3, lettrage,
+             type_ecriture, debit, credit, solde) = get_fields(row)
+            yield (
+                code_compte.strip(),
+                reference_piece.strip() or None,
+                libelle_compte.strip() or None,
+                reference_piece_2.strip() or None,
+                parse_date(date_ecriture),
+                journal.strip() or None,
+                numero_piece.strip() or None,
+                libelle_ecriture.strip() or None,
+                reference_piece_3.strip() or None,
+                lettrage.strip() or None,
+                type_ecriture.strip() or None,
+                parse_decimal(debit),
+                parse_decimal(credit),
+                parse_decimal(solde)
+            )
+        except Exception as e:
+            logger.warning("Ligne rejetée: %r (%s)", row, e)
+
+def parse_decimal_column(values, label):
+    """Convertir une colonne de montants texte (virgule décimale) en float, 0 si vide ou invalide"""
+    values = values.fillna('')
+    numbers = pd.to_numeric(values.str.replace(',', '.', regex=False), errors='coerce')
+    invalid = numbers.isna() & (values != '')
+    if invalid.any():
+        logger.warning("%d montants invalides dans %s remplacés par 0: %s",
+                       invalid.sum(), label, ', '.join(values[invalid].unique()[:10]))
+    return numbers.fillna(0.0)
+
+def read_csv_chunks(file, idx, decimal_columns, typed_decimals):
+    """Lire par paquets, par position, les colonnes idx d'un flux CSV positionné après l'en-tête
     
-    # Table TVA clients
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tva_clients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            code_compte VARCHAR(20) NOT NULL,
-            reference_piece VARCHAR(50),
-            libelle_compte VARCHAR(200),
-            reference_piece_2 VARCHAR(50),
-            date_ecriture DATE,
-            journal VARCHAR(20),
-            numero_piece VARCHAR(50),
-            libelle_ecriture TEXT,
-            reference_piece_3 VARCHAR(50),
-            lettrage VARCHAR(20),
-            type_ecriture VARCHAR(10),
-            debit DECIMAL(15,2) DEFAULT 0,
-            credit DECIMAL(15,2) DEFAULT 0,
-            solde DECIMAL(15,2) DEFAULT 0,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+    Avec typed_decimals, les montants (virgule décimale) sont convertis en
+    float64 directement par le tokenizer C de pandas; sinon tout est lu en texte.
+    """
+    positions = sorted(set(idx.values()))
+    decimal_positions = {idx[column] for column in decimal_columns} if typed_decimals else set()
+    return pd.read_csv(
+        file, sep=';', header=None, usecols=positions,
+        dtype={position: 'float64' if position in decimal_positions else str for position in positions},
+        decimal=',', keep_default_na=False,
+        na_values={position: [''] for position in decimal_positions},
+        chunksize=PANDAS_CHUNK_SIZE
+    )
+
+def load_csv_chunks(conn, table, file_path, columns, insert_sql, date_columns, decimal_columns, nullable_columns,
+                    required_columns, typed_decimals):
+    """Convertir et insérer un fichier CSV paquet par paquet (voir import_csv_with_pandas)
     
-    conn.commit()
-    print("Tables créées avec succès")
+    Les paquets sont insérés par executemany sur la connexion, sans commit:
+    DataFrame.to_sql validerait la transaction à chaque paquet.
+    """
+    with open_csv(file_path) as file:
+        header = next(csv.reader(file, delimiter=';'))
+        idx = column_indices(header, columns)
+        
+        # Lecture par position pour conserver les en-têtes répétés du fichier TVA;
+        # pandas reprend le même flux, juste après l'en-tête
+        chunks = read_csv_chunks(file, idx, decimal_columns, typed_decimals)
+        
+        count = 0
+        for data in chunks:
+            # Champs absents des lignes courtes: NaN, rejetés via required_columns
+            df = pd.DataFrame({
+                column: data[idx[column]] if typed_decimals and column in decimal_columns
+                else data[idx[column]].str.strip()
+                for column, _ in columns
+            })
+            for column in decimal_columns:
+                if typed_decimals:
+                    df[column] = df[column].fillna(0.0)
+                else:
+                    df[column] = parse_decimal_column(df[column], f"{table}.{column}")
+            for column in date_columns:
+                df[column] = pd.to_datetime(df[column], format='%Y-%m-%d', errors='coerce').dt.strftime('%Y-%m-%d')
+            df = df.astype(object).where(df.notna(), None)
+            for column in nullable_columns:
+                df[column] = df[column].where(df[column] != '', None)
+            if required_columns:
+                rejected = df[list(required_columns)].isna().any(axis=1)
+                if rejected.any():
+                    logger.warning("%d lignes rejetées dans %s: colonne obligatoire vide ou invalide (%s)",
+                                   rejected.sum(), table, ', '.join(required_columns))
+                    df = df[~rejected]
+            
+            # Colonnes du DataFrame dans l'ordre de insert_sql
+            conn.executemany(insert_sql, df.itertuples(index=False, name=None))
+            count += len(df)
+            print(f"Importé {count} lignes dans {table}...")
+        return count
 
-def import_bank_transactions(conn):
-    """Importer les transactions bancaires"""
-    print("Import des transactions bancaires...")
+def import_csv_with_pandas(conn, table, file_path, columns, insert_sql, date_columns, decimal_columns,
+                           nullable_columns, required_columns=()):
+    """Importer un fichier CSV avec le parseur C de pandas, dans la transaction en cours
     
-    cursor = conn.cursor()
+    Les montants sont d'abord convertis par le tokenizer C; si l'un d'eux n'est
+    pas numérique, les lignes déjà insérées (non validées) sont supprimées et
+    le fichier relu en texte pour que seules les valeurs invalides soient
+    remplacées par 0. La validation est laissée à l'appelant.
+    """
+    options = dict(insert_sql=insert_sql, date_columns=date_columns, decimal_columns=decimal_columns,
+                   nullable_columns=nullable_columns, required_columns=required_columns)
+    with open_csv(file_path) as file:
+        # En-tête vérifié une seule fois: une colonne manquante n'est pas réessayée
+        column_indices(next(csv.reader(file, delimiter=';')), columns)
+    try:
+        return load_csv_chunks(conn, table, file_path, columns, typed_decimals=True, **options)
+    except ValueError:
+        logger.warning("Montants non numériques dans %s: relecture en texte", file_path)
+        # Repartir d'une table vide (même transaction)
+        conn.execute(f'DELETE FROM {table}')
+        return load_csv_chunks(conn, table, file_path, columns, typed_decimals=False, **options)
+
+def create_tables(conn):
+    """Créer les tables si elles n'existent pas"""
+    existing = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (?, ?)",
+        IMPORT_TABLES
+    ).fetchone()[0]
+    if existing == len(IMPORT_TABLES):
+        print("Tables déjà présentes")
+        return
     
-    # Vider la table
-    cursor.execute('DELETE FROM bank_transactions')
+    # executescript valide la transaction en cours puis exécute tout le DDL
+    conn.executescript(SCHEMA_SQL)
+    print("Tables créées avec succès")
+
+def bulk_load(conn, tables, load):
+    """Exécuter load() sans les index secondaires des tables importées
     
-    file_path = '/home/ubuntu/upload/banque.csv'
+    Les index sont supprimés avant le chargement puis recréés en une passe,
+    et les statistiques de l'optimiseur sont recalculées (ANALYZE).
+    """
+    placeholders = ', '.join('?' for _ in tables)
+    indexes = conn.execute(
+        f"SELECT name, sql FROM sqlite_master "
+        f"WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        tables
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    conn.commit()
     
     try:
-        with open(file_path, 'r', encoding='iso-8859-1') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            
-            count = 0
-            for row in reader:
-                try:
-                    cursor.execute('''
-                        INSERT INTO bank_transactions 
-                        (compte_general, role_tiers, date_ecriture, numero_piece, date_reference, 
-                         libelle, devise, montant_tr, montant_tc, montant_signe_tc, sens, bq)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        row.get('Compte général', '').strip(),
-                        row.get('Rôle tiers', '').strip() or None,
-                        parse_date(row.get('Date écriture', '')),
-                        row.get('N° pièce', '').strip(),
-                        parse_date(row.get('Date de référence', '')),
-                        row.get('Libellé', '').strip(),
-                        row.get('Devise', '').strip(),
-                        parse_decimal(row.get('Montant TR (MAD)', '0')),
-                        parse_decimal(row.get('Montant TC', '0')),
-                        parse_decimal(row.get('Montant signé TC', '0')),
-                        row.get('Sens', '').strip(),
-                        parse_decimal(row.get('bq', '0'))
-                    ))
-                    
-                    count += 1
-                    
-                    if count % 100 == 0:
-                        conn.commit()
-                        print(f"Importé {count} transactions bancaires...")
-                        
-                except Exception as e:
-                    print(f"Erreur lors de l'import de la ligne: {row}")
-                    print(f"Erreur: {e}")
-                    continue
-            
-            conn.commit()
-            print(f"Import terminé: {count} transactions bancaires importées")
-            
-    except Exception as e:
-        print(f"Erreur lors de l'ouverture du fichier: {e}")
+        load()
+    finally:
+        for _, sql in indexes:
+            conn.execute(sql)
+        conn.execute('ANALYZE')
+        conn.commit()
 
-def import_tva_clients(conn):
-    """Importer les données TVA clients"""
-    print("Import des données TVA clients...")
+# Description de chaque import: fichier source, table, parseur ligne à ligne
+# (repli sans pandas) et conversions par colonne (chemin pandas)
+BANK_IMPORT = {
+    'table': 'bank_transactions',
+    'label': 'transactions bancaires',
+    'file_path': '/home/ubuntu/upload/banque.csv',
+    'columns': BANK_COLUMNS,
+    'insert_sql': INSERT_BANK_TRANSACTION_SQL,
+    'iter_rows': iter_bank_transactions,
+    'date_columns': ('date_ecriture', 'date_reference'),
+    'decimal_columns': ('montant_tr', 'montant_tc', 'montant_signe_tc', 'bq'),
+    'nullable_columns': ('role_tiers',),
+    'required_columns': ('compte_general', 'date_ecriture', 'numero_piece',
+                         'libelle', 'devise', 'sens'),
+}
+
+TVA_IMPORT = {
+    'table': 'tva_clients',
+    'label': 'enregistrements TVA',
+    'file_path': '/home/ubuntu/upload/déclarationtvacollectéeclientsmai2025.csv',
+    'columns': TVA_COLUMNS,
+    'insert_sql': INSERT_TVA_CLIENT_SQL,
+    'iter_rows': iter_tva_clients,
+    'date_columns': ('date_ecriture',),
+    'decimal_columns': ('debit', 'credit', 'solde'),
+    'nullable_columns': ('reference_piece', 'libelle_compte', 'reference_piece_2',
+                         'journal', 'numero_piece', 'libelle_ecriture',
+                         'reference_piece_3', 'lettrage', 'type_ecriture'),
+    'required_columns': ('code_compte',),
+}
+
+def import_table(conn, table, label, file_path, columns, insert_sql, iter_rows,
+                 date_columns, decimal_columns, nullable_columns, required_columns):
+    """Vider une table puis la remplir depuis son fichier CSV, en une seule transaction"""
+    print(f"Import des {label}...")
     
     cursor = conn.cursor()
     
     # Vider la table
-    cursor.execute('DELETE FROM tva_clients')
-    
-    file_path = '/home/ubuntu/upload/déclarationtvacollectéeclientsmai2025.csv'
+    cursor.execute(f'DELETE FROM {table}')
     
     try:
-        with open(file_path, 'r', encoding='iso-8859-1') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            
-            count = 0
-            for row in reader:
-                try:
-                    cursor.execute('''
-                        INSERT INTO tva_clients 
-                        (code_compte, reference_piece, libelle_compte, reference_piece_2, date_ecriture,
-                         journal, numero_piece, libelle_ecriture, reference_piece_3, lettrage,
-                         type_ecriture, debit, credit, solde)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        row.get('Code Compte', '').strip(),
-                        row.get('Référence pièce', '').strip() or None,
-                        row.get('Libellé Compte', '').strip() or None,
-                        row.get('Référence pièce', '').strip() or None,  # 2ème colonne
-                        parse_date(row.get('Date écriture', '')),
-                        row.get('Journal', '').strip() or None,
-                        row.get('Numéro de pièce', '').strip() or None,
-                        row.get('Libellé écriture', '').strip() or None,
-                        row.get('Référence pièce', '').strip() or None,  # 3ème colonne
-                        row.get('Lettrage', '').strip() or None,
-                        row.get('Type écriture', '').strip() or None,
-                        parse_decimal(row.get('Débit', '0')),
-                        parse_decimal(row.get('Crédit', '0')),
-                        parse_decimal(row.get('Solde', '0'))
-                    ))
-                    
-                    count += 1
-                    
-                    if count % 100 == 0:
-                        conn.commit()
-                        print(f"Importé {count} enregistrements TVA...")
-                        
-                except Exception as e:
-                    print(f"Erreur lors de l'import de la ligne: {row}")
-                    print(f"Erreur: {e}")
-                    continue
-            
-            conn.commit()
-            print(f"Import terminé: {count} enregistrements TVA importés")
-            
+        if PANDAS_AVAILABLE:
+            count = import_csv_with_pandas(
+                conn, table, file_path, columns, insert_sql,
+                date_columns=date_columns,
+                decimal_columns=decimal_columns,
+                nullable_columns=nullable_columns,
+                required_columns=required_columns
+            )
+        else:
+            with open_csv(file_path) as file:
+                reader = csv.reader(file, delimiter=';')
+                # Les lignes sont produites à la demande: executemany boucle en C
+                # sans liste intermédiaire, la mémoire reste constante
+                cursor.executemany(insert_sql, iter_rows(reader))
+                count = cursor.rowcount
+        
+        # Une seule transaction pour tout le fichier
+        conn.commit()
+        print(f"Import terminé: {count} {label} importés")
+        
     except Exception as e:
-        print(f"Erreur lors de l'ouverture du fichier: {e}")
+        conn.rollback()
+        print(f"Erreur lors de l'import du fichier: {e}")
+
+def import_bank_transactions(conn):
+    """Importer les transactions bancaires"""
+    import_table(conn, **BANK_IMPORT)
+
+def import_tva_clients(conn):
+    """Importer les données TVA clients"""
+    import_table(conn, **TVA_IMPORT)
 
 def main():
     """Fonction principale d'import"""
@@ -199,14 +501,19 @@ def main():
     # Connexion à la base de données SQLite
     db_path = '/home/ubuntu/sage-ai-comptable/backend/sage-ai-backend/sage_ai.db'
     conn = sqlite3.connect(db_path)
+    for pragma in BULK_LOAD_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    rejects_log = setup_rejects_log()
     
     try:
         # Créer les tables
         create_tables(conn)
         
         # Importer les données
-        import_bank_transactions(conn)
-        import_tva_clients(conn)
+        def load():
+            import_bank_transactions(conn)
+            import_tva_clients(conn)
+        bulk_load(conn, IMPORT_TABLES, load)
         
         # Afficher les statistiques
         cursor = conn.cursor()
@@ -220,8 +527,10 @@ def main():
         print(f"Transactions bancaires: {bank_count}")
         print(f"Enregistrements TVA: {tva_count}")
         print(f"Total: {bank_count + tva_count} enregistrements")
+        print(f"Lignes rejetées et valeurs invalides: voir {REJECTS_LOG_PATH}")
         
     finally:
+        close_rejects_log(rejects_log)
         conn.close()
 
 if __name__ == '__main__':
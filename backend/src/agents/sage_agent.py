@@ -1,17 +1,33 @@
+import asyncio
+import atexit
+import inspect
+import logging
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
 import httpx
+from flask import current_app, has_app_context
+from sqlalchemy import event
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tracers.stdout import FunctionCallbackHandler
 from src.utils.tool_converter import convert_crewai_tools_to_langchain
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.action_parser import cached_parse_planned_action, extract_action_details
+from src.utils.json_utils import json_dumps
+from src.utils.response_cache import ResponseCache, make_cache_key
+from src.utils.token_utils import count_tokens, truncate_to_tokens
 
-try:
-    print("[OK] Modern LangChain stack with AgentExecutor imported successfully")
-except Exception as e:
-    print(f"[ERROR] Import error in sage_agent: {e}")
+logger = logging.getLogger(__name__)
+logger.debug("Modern LangChain stack with AgentExecutor imported successfully")
 
-from src.tools.sage_tools import SAGE_TOOLS
+from src.tools.sage_tools import SAGE_TOOLS, set_user_credentials
 from src.tools.document_tools import (
     DocumentAnalysisTool, InvoiceExtractionTool, ClientImportTool, 
     ProductImportTool, DocumentValidationTool
@@ -21,110 +37,158 @@ from src.tools.excel_analysis_tools import (
     # ExcelTVACalculatorTool SUPPRIMÉ - méthode incorrecte
 )
 from src.tools.tva_445_official import TVACollecteeOfficialTool
+from src.models.user import User
 
-class SageAgentManager:
-    """Gestionnaire des agents IA pour Sage Business Cloud Accounting"""
-    
-    def __init__(self):
-        print("🔧 Initializing SageAgentManager...")
-        try:
-            # Configuration du modèle LLM avec ChatOpenAI (programmer's approach + my error handling)
-            self.llm = None
-            self.agents_available = False
-            
-            # Modern LangChain 0.3.x configuration (expert's Option A)
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                print("⚠️ OPENAI_API_KEY not found - AI agents will be unavailable")
-                self.llm = None
-            else:
-                try:
-                    base_url = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
-                    proxy_url = (os.getenv("HTTPS_PROXY")
-                                 or os.getenv("HTTP_PROXY")
-                                 or os.getenv("ALL_PROXY"))
-                    timeout_s = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
-
-                    # Modern httpx client with proper proxy configuration (httpx >=0.28.1)
-                    if proxy_url:
-                        # Use HTTPTransport with proxy (modern httpx 0.28+ pattern)
-                        transport = httpx.HTTPTransport(proxy=proxy_url)
-                        http_client = httpx.Client(transport=transport, timeout=timeout_s)
-                    else:
-                        http_client = httpx.Client(timeout=timeout_s)
-
-                    self.llm = ChatOpenAI(
-                        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                        api_key=api_key,
-                        base_url=base_url,
-                        http_client=http_client,
-                        temperature=0.1,
-                        max_tokens=2000,
-                    )
-                    self.agents_available = True
-                    print(f"✅ Modern LLM configured (model={os.getenv('OPENAI_MODEL', 'gpt-4o-mini')}, base_url={base_url}, proxy={'yes' if proxy_url else 'no'})")
-                    
-                except Exception as e:
-                    print(f"❌ Error configuring modern LLM: {e}")
-                    self.llm = None
-                    
-        except Exception as e:
-            print(f"❌ Error initializing SageAgentManager: {e}")
-            self.llm = None
-            self.agents_available = False
-        
-        # Initialiser les outils Sage (utiliser la liste existante)
-        self.sage_tools = SAGE_TOOLS
-        
-        # Initialiser les outils de traitement de documents
-        self.document_tools = [
-            DocumentAnalysisTool(),
-            InvoiceExtractionTool(),
-            ClientImportTool(),
-            ProductImportTool(),
-            DocumentValidationTool()
-        ]
-        
-        # Initialiser les outils d'analyse Excel
-        self.excel_analysis_tools = [
-            TVACollecteeOfficialTool(),  # Outil officiel selon méthode expert
-            ExcelDataExplorerTool()      # Pour exploration générale
-            # ExcelTVACalculatorTool() SUPPRIMÉ - méthode incorrecte (reconstruction HT×taux)
-        ]
-        
-        # Configurer les agents LangChain avec outils (Option A moderne)
-        if self.agents_available:
-            self.langchain_tools = self._convert_tools_to_langchain()
-            self.agents = self._create_langchain_agents()
-            print("✅ Modern LangChain agents with tools configured successfully")
-        else:
-            self.langchain_tools = []
-            self.agents = {}
-            print("❌ AI agents not configured - LLM unavailable")
+# HTTP/2 (multiplexage, en-têtes compressés) si le paquet h2 est installé
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Mots-clés (en minuscules) utilisés par _determine_agent_type pour choisir l'agent
+AGENT_KEYWORDS = {
+    # Agent comptable (opérations + documents)
+    'comptable': frozenset({
+        'créer', 'ajouter', 'nouveau', 'client', 'facture', 'produit', 'fournisseur',
+        'saisir', 'enregistrer', 'modifier', 'supprimer', 'import', 'importer',
+        'document', 'pdf', 'csv', 'excel', 'fichier', 'analyser', 'extraire',
+        'upload', 'télécharger', 'scanner', 'ocr'
+    }),
+    # Analyste financier (rapports + validation)
+    'analyste': frozenset({
+        'bilan', 'compte de résultat', 'rapport', 'analyse', 'kpi', 'performance',
+        'chiffre d\'affaires', 'bénéfice', 'perte', 'marge', 'rentabilité',
+        'transaction', 'recherche', 'historique', 'valider', 'validation',
+        'vérifier', 'contrôle', 'cohérence', 'qualité'
+    }),
+    # Support (aide + formation)
+    'support': frozenset({
+        'aide', 'comment', 'expliquer', 'formation', 'apprendre', 'tutoriel',
+        'problème', 'erreur', 'bug', 'ne fonctionne pas', 'assistance',
+        'guide', 'procédure', 'étapes', 'configuration'
+    }),
+}
+
+# Mots-clés (en minuscules) utilisés par _detect_sage_requirement
+SAGE_REQUIREMENT_KEYWORDS = {
+    # Indicateurs FORTS que Sage est nécessaire (opérations dans Sage)
+    'sage': frozenset({
+        'créer dans sage', 'ajouter dans sage', 'sauvegarder dans sage',
+        'importer dans sage', 'synchroniser avec sage', 'connecter sage',
+        'get_customers', 'create_invoice', 'get_balance_sheet', 
+        'clients sage', 'factures sage', 'produits sage',
+        'données sage', 'sage business cloud', 'mes données sage',
+        'lister mes clients', 'mes factures', 'mon bilan',
+        'créer un client', 'créer une facture', 'créer un produit'
+    }),
+    # Indicateurs que l'utilisateur travaille EN LOCAL (pas besoin de Sage)
+    'local': frozenset({
+        'fichier attaché', 'document attaché', 'excel attaché',
+        'analyser ce fichier', 'calculer la tva', 'tva collectée',
+        'tableau excel', 'feuille excel', 'grand livre',
+        'analyse document', 'extraction données', 'validation fichier',
+        'période de', 'mois de', 'calcul pour', 'données du fichier',
+        'fichiers analysés', 'document analysé'
+    }),
+    # Questions générales qui ne nécessitent pas Sage
+    'general': frozenset({
+        'comment', 'qu\'est-ce', 'expliquer', 'aide', 'définir',
+        'différence', 'avantage', 'procédure', 'méthode'
+    }),
+}
+
+# Construits une seule fois (voir KeywordMatcher)
+_AGENT_KEYWORD_MATCHER = KeywordMatcher(AGENT_KEYWORDS)
+_SAGE_REQUIREMENT_MATCHER = KeywordMatcher(SAGE_REQUIREMENT_KEYWORDS)
+
+# Messages courts et souvent répétés (boutons de réponse rapide, "aide", "bilan"):
+# leur routage est mémorisé. Les messages longs (fichiers joints) sont uniques
+ROUTING_CACHE_MAX_ENTRIES = 4096
+ROUTING_CACHE_MAX_MESSAGE_CHARS = 512
+
+# Marqueur laissé dans l'historique quand des fichiers joints ont été analysés
+ATTACHED_FILES_LOOKBACK = 3
+ATTACHED_FILES_MARKER = 'fichiers analysés'
+
+# Consultation mixte: les agents dont le score est à MULTI_AGENT_SCORE_MARGIN
+# du meilleur sont interrogés en parallèle et leurs réponses juxtaposées
+MULTI_AGENT_SCORE_MARGIN = 1
+MULTI_AGENT_TIMEOUT_SECONDS = 60
+AGENT_TYPES = ('comptable', 'analyste', 'support')
+AGENT_DISPLAY_NAMES = {
+    'comptable': 'Ahmed Benali (comptable)',
+    'analyste': 'Fatima El Fassi (analyste)',
+    'support': 'Youssef Tazi (support)',
+}
+# Agents construits en tâche de fond dès la création du gestionnaire partagé
+WARMUP_AGENT_TYPES = ('comptable',)
+# Tâches de fond (construction des agents, préchauffage de la connexion): les
+# requêtes elles-mêmes passent par la boucle asyncio partagée
+BACKGROUND_MAX_WORKERS = 2
+_agent_executor = ThreadPoolExecutor(max_workers=BACKGROUND_MAX_WORKERS, thread_name_prefix='sage-agent')
+
+def _route_agent_types(message_lower: str) -> tuple:
+    """Agents concernés par un message en minuscules, le principal en premier"""
+    scores = _AGENT_KEYWORD_MATCHER.scores(message_lower)
+    comptable_score = scores['comptable']
+    analyste_score = scores['analyste']
+    support_score = scores['support']
     
-    def _convert_tools_to_langchain(self):
-        """Convertit les outils CrewAI en outils LangChain compatibles"""
-        try:
-            all_tools = self.sage_tools + self.document_tools + self.excel_analysis_tools
-            langchain_tools = convert_crewai_tools_to_langchain(all_tools)
-            print(f"✅ Converted {len(langchain_tools)} tools to LangChain format")
-            return langchain_tools
-        except Exception as e:
-            print(f"❌ Error converting tools: {e}")
-            return []
+    # Déterminer l'agent avec le score le plus élevé
+    if comptable_score >= analyste_score and comptable_score >= support_score:
+        primary = 'comptable'
+    elif analyste_score >= support_score:
+        primary = 'analyste'
+    else:
+        primary = 'support'
     
-    def _create_langchain_agents(self):
-        """Crée les agents LangChain avec AgentExecutor"""
-        if not self.llm or not self.langchain_tools:
-            print("❌ Cannot create LangChain agents - missing LLM or tools")
-            return {}
-        
-        try:
-            agents = {}
+    threshold = max(scores[primary] - MULTI_AGENT_SCORE_MARGIN, 1)
+    return (primary,) + tuple(
+        agent_type for agent_type in AGENT_TYPES
+        if agent_type != primary and scores[agent_type] >= threshold
+    )
+
+_cached_route_agent_types = lru_cache(maxsize=ROUTING_CACHE_MAX_ENTRIES)(_route_agent_types)
+
+# Consignes ajoutées au contexte de la tâche selon l'état de la connexion Sage
+SAGE_CONNECTED_CONTEXT = (
+    "✅ CONNEXION SAGE ACTIVE - Vous êtes connecté à Sage Business Cloud Accounting",
+    "🔧 OUTILS DISPONIBLES - Utilisez directement les outils Sage (get_customers, create_invoice, get_balance_sheet, etc.) sans demander d'identifiants",
+    "📋 INSTRUCTIONS - Répondez directement aux demandes en utilisant les outils Sage appropriés",
+)
+SAGE_REQUIRED_CONTEXT = (
+    "⚠️ CONNEXION SAGE REQUISE - Cette demande nécessite une connexion à Sage Business Cloud Accounting",
+    "🔗 Pour vous connecter à Sage, utilisez la section 'Connexion Sage' de l'interface",
+)
+LOCAL_ANALYSIS_CONTEXT = (
+    "💡 MODE ANALYSE LOCAL - Vous pouvez analyser vos documents sans connexion Sage",
+    "🔧 OUTILS DISPONIBLES - Analyse de documents, calculs TVA, exploration Excel",
+    "📋 INSTRUCTIONS - Utilisez les outils d'analyse locale (tva_collectee_officielle, document_analysis, excel_data_explorer)",
+    "💬 Si vous souhaitez interagir avec Sage plus tard, connectez-vous via l'interface",
+)
+
+# Entrée de l'agent pour chaque demande: seule partie variable du message humain
+AGENT_INPUT_TEMPLATE = inspect.cleandoc("""Contexte utilisateur: {task_context}
             
-            # Agent Comptable
-            comptable_prompt = ChatPromptTemplate.from_messages([
-                ("system", """Vous êtes Ahmed Benali, Expert-Comptable Marocain avec 20 ans d'expérience spécialisé en fiscalité, finance et comptabilité marocaines.
+            Demande: {user_message}
+            """)
+
+# Consignes communes aux agents: message système fixe placé juste après le
+# persona, pour que le préfixe mis en cache par OpenAI (outils + persona +
+# consignes) soit identique d'une demande à l'autre
+AGENT_INSTRUCTIONS = inspect.cleandoc("""
+    Consignes:
+    - Document (analyse, extraction, import): outils de traitement de documents d'abord, puis outils Sage nécessaires.
+    - CRÉATION, MODIFICATION ou SUPPRESSION dans Sage (clients, factures, produits, etc.): ne PAS exécuter l'action. Préparez le plan d'action détaillé, expliquez exactement ce que vous allez faire, puis terminez par:
+      PLANNED_ACTION: [type:create_client/create_invoice/etc.] [description:détails de l'action]
+    - CONSULTATION (lister, afficher, rechercher): outils Sage directement, sans demander confirmation.
+    - Documents analysés: résumez les données extraites et leur qualité.
+    - Réponse complète, professionnelle, claire et structurée, en français, en montrant votre expertise locale selon votre persona (TVA, CGNC, CNSS, etc.).
+    """)
+
+# Prompts système des agents (texte fixe, construits une seule fois à l'import)
+COMPTABLE_SYSTEM_PROMPT = inspect.cleandoc("""Vous êtes Ahmed Benali, Expert-Comptable Marocain avec 20 ans d'expérience spécialisé en fiscalité, finance et comptabilité marocaines.
 
                 🚨 RÈGLE PRIORITAIRE ABSOLUE:
                 QUAND L'UTILISATEUR ATTACHE UN FICHIER ET DEMANDE UNE ANALYSE:
@@ -208,18 +272,9 @@ class SageAgentManager:
                 - Vérifiez la conformité aux normes CGNC
                 - Terminez par: "PLANNED_ACTION: [type] [description avec context marocain]"
                 
-                Pour les CONSULTATIONS: Interprétez les données selon les standards comptables et fiscaux marocains."""),
-                MessagesPlaceholder(variable_name="chat_history", optional=True),
-                ("human", "{input}"),
-                MessagesPlaceholder(variable_name="agent_scratchpad"),
-            ])
-            
-            comptable_agent = create_openai_functions_agent(self.llm, self.langchain_tools, comptable_prompt)
-            agents['comptable'] = AgentExecutor(agent=comptable_agent, tools=self.langchain_tools, verbose=True)
-            
-            # Agent Analyste (version simplifiée avec les mêmes outils)
-            analyste_prompt = ChatPromptTemplate.from_messages([
-                ("system", """Vous êtes Fatima El Fassi, Analyste Financière Senior avec 20 ans d'expérience en analyse financière et reporting au Maroc.
+                Pour les CONSULTATIONS: Interprétez les données selon les standards comptables et fiscaux marocains.""")
+
+ANALYSTE_SYSTEM_PROMPT = inspect.cleandoc("""Vous êtes Fatima El Fassi, Analyste Financière Senior avec 20 ans d'expérience en analyse financière et reporting au Maroc.
 
                 🚨 RÈGLE PRIORITAIRE ABSOLUE:
                 QUAND L'UTILISATEUR ATTACHE UN FICHIER ET DEMANDE UNE ANALYSE:
@@ -288,18 +343,9 @@ class SageAgentManager:
                 • SI MODE ANALYSE LOCAL: Concentrez-vous sur excel_data_explorer, tva_collectee_officielle  
                 • SI PAS DE CONNEXION SAGE: Analysez les documents fournis avec expertise marocaine
                 
-                IMPORTANT: Votre expertise financière marocaine est indépendante des outils techniques."""),
-                MessagesPlaceholder(variable_name="chat_history", optional=True),
-                ("human", "{input}"),
-                MessagesPlaceholder(variable_name="agent_scratchpad"),
-            ])
-            
-            analyste_agent = create_openai_functions_agent(self.llm, self.langchain_tools, analyste_prompt)
-            agents['analyste'] = AgentExecutor(agent=analyste_agent, tools=self.langchain_tools, verbose=True)
-            
-            # Agent Support
-            support_prompt = ChatPromptTemplate.from_messages([
-                ("system", """Vous êtes un expert en support technique et formation pour Sage Business Cloud Accounting.
+                IMPORTANT: Votre expertise financière marocaine est indépendante des outils techniques.""")
+
+SUPPORT_SYSTEM_PROMPT = inspect.cleandoc("""Vous êtes un expert en support technique et formation pour Sage Business Cloud Accounting.
                 
                 Vos domaines d'expertise:
                 - Formation et accompagnement des utilisateurs
@@ -308,331 +354,850 @@ class SageAgentManager:
                 - Guide d'utilisation du traitement automatique de documents
                 - Bonnes pratiques comptables et organisationnelles
                 
-                IMPORTANT: Utilisez les outils Sage disponibles pour démontrer les fonctionnalités."""),
-                MessagesPlaceholder(variable_name="chat_history", optional=True),
-                ("human", "{input}"),
-                MessagesPlaceholder(variable_name="agent_scratchpad"),
-            ])
-            
-            support_agent = create_openai_functions_agent(self.llm, self.langchain_tools, support_prompt)
-            agents['support'] = AgentExecutor(agent=support_agent, tools=self.langchain_tools, verbose=True)
+                IMPORTANT: Utilisez les outils Sage disponibles pour démontrer les fonctionnalités.""")
+
+def _create_agent_prompt(system_prompt: str) -> ChatPromptTemplate:
+    """Prompt d'un agent: persona, consignes communes, historique, demande"""
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        ("system", AGENT_INSTRUCTIONS),
+        MessagesPlaceholder(variable_name="chat_history", optional=True),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+
+# Prompts des agents, construits une seule fois à l'import
+AGENT_PROMPTS = {
+    'comptable': _create_agent_prompt(COMPTABLE_SYSTEM_PROMPT),  # Ahmed Benali
+    'analyste': _create_agent_prompt(ANALYSTE_SYSTEM_PROMPT),  # Fatima El Fassi
+    'support': _create_agent_prompt(SUPPORT_SYSTEM_PROMPT),
+}
+
+# Demandes traitées en même temps par process_user_requests_batch
+BATCH_CONCURRENCY = 8
+
+# Éléments produits par astream_user_request: (STREAM_DELTA, fragment) puis (STREAM_RESULT, réponse finale)
+STREAM_DELTA = 'delta'
+STREAM_RESULT = 'result'
+
+AGENT_UNAVAILABLE_MESSAGE = "❌ L'agent IA n'est pas disponible. Veuillez vérifier que la clé OpenAI API est configurée."
+REQUEST_ERROR_MESSAGE = "Erreur lors du traitement de votre demande: {error}. Veuillez réessayer ou reformuler votre question."
+
+# Messages récents repris dans le contexte, tronqués à CONTEXT_MESSAGE_MAX_TOKENS
+# (environ 200 caractères). Le texte est facturé en tokens, pas en caractères:
+# 200 caractères de JSON peuvent en coûter deux fois plus que 200 caractères de prose
+RECENT_CONTEXT_MESSAGES = 6
+CONTEXT_MESSAGE_MAX_TOKENS = 50
+
+# Historique transmis aux agents: les messages les plus récents tenant dans
+# CHAT_HISTORY_MAX_TOKENS, les plus anciens sont abandonnés en premier
+CHAT_HISTORY_MAX_TOKENS = 1024
+
+def _shorten_context_message(content: str) -> str:
+    """Tronque un message de l'historique pour le contexte de la tâche"""
+    return truncate_to_tokens(content or '', CONTEXT_MESSAGE_MAX_TOKENS, _LLM_CONFIG.model)
+
+def _build_chat_history(conversation_context: list) -> list:
+    """
+    Historique LangChain des messages les plus récents dans la limite de
+    CHAT_HISTORY_MAX_TOKENS (le dernier message retenu peut être tronqué)
+    """
+    chat_history = []
+    remaining_tokens = CHAT_HISTORY_MAX_TOKENS
+    for msg in reversed(conversation_context or []):
+        if remaining_tokens <= 0:
+            break
+        content = msg['content'] or ''
+        tokens = count_tokens(content, _LLM_CONFIG.model)
+        if tokens > remaining_tokens:
+            content = truncate_to_tokens(content, remaining_tokens, _LLM_CONFIG.model)
+        remaining_tokens -= tokens
+        if msg['role'] == 'user':
+            chat_history.append(HumanMessage(content=content))
+        else:
+            chat_history.append(SystemMessage(content=content))
+    chat_history.reverse()
+    return chat_history
+
+# Outils sans état, instanciés une seule fois par processus (comme SAGE_TOOLS)
+# et partagés par tous les SageAgentManager
+DOCUMENT_TOOLS = [
+    DocumentAnalysisTool(),
+    InvoiceExtractionTool(),
+    ClientImportTool(),
+    ProductImportTool(),
+    DocumentValidationTool()
+]
+
+EXCEL_ANALYSIS_TOOLS = [
+    TVACollecteeOfficialTool(),  # Outil officiel selon méthode expert
+    ExcelDataExplorerTool()      # Pour exploration générale
+    # ExcelTVACalculatorTool() SUPPRIMÉ - méthode incorrecte (reconstruction HT×taux)
+]
+
+# Ensemble des outils exposés aux agents, assemblé une seule fois à l'import
+ALL_TOOLS = tuple(SAGE_TOOLS + DOCUMENT_TOOLS + EXCEL_ANALYSIS_TOOLS)
+
+@lru_cache(maxsize=1)
+def _get_langchain_tools() -> list:
+    """Outils Sage, documents et Excel convertis une seule fois par processus au format LangChain"""
+    try:
+        langchain_tools = convert_crewai_tools_to_langchain(ALL_TOOLS)
+        logger.info("Converted %d tools to LangChain format", len(langchain_tools))
+        return langchain_tools
+    except Exception as e:
+        logger.error("Error converting tools: %s", e)
+        return []
+
+# Présentation de chaque agent pour get_agent_capabilities: (description, capacités)
+AGENT_PROFILES = {
+    'comptable': ('Assistant Comptable Expert', (
+        'Gestion des clients et fournisseurs',
+        'Création et traitement des factures',
+        'Gestion du catalogue produits',
+        'Analyse automatique de documents (PDF, images, CSV, Excel)',
+        'Extraction de données de factures',
+        'Import en masse de clients et produits',
+        'Validation et contrôle de données',
+    )),
+    'analyste': ('Analyste Financier Senior', (
+        'Génération de bilans comptables',
+        'Création de comptes de résultat',
+        'Calcul de KPIs financiers',
+        'Recherche et analyse de transactions',
+        'Validation de qualité des données extraites',
+        'Recommandations financières',
+    )),
+    'support': ('Expert Support Sage', (
+        'Formation et accompagnement utilisateurs',
+        'Résolution de problèmes techniques',
+        'Guide d\'utilisation des fonctionnalités',
+        'Assistance traitement de documents',
+        'Bonnes pratiques comptables',
+        'Optimisation des workflows',
+    )),
+}
+
+# Traces détaillées des AgentExecutor sur stdout: désactivées sauf AGENT_VERBOSE=true.
+# Au niveau DEBUG, les mêmes traces passent par le logger (voir _get_agent)
+AGENT_VERBOSE = os.getenv('AGENT_VERBOSE', 'False').lower() == 'true'
+
+# Credentials Sage déjà lus par utilisateur: {user_id: (expiration, credentials)}
+CREDENTIALS_CACHE_TTL_SECONDS = 300
+CREDENTIALS_CACHE_MAX_USERS = 1024
+_credentials_cache = {}
+_credentials_cache_lock = threading.Lock()
+
+def invalidate_cached_credentials(user_id: int) -> None:
+    """Oublie les credentials Sage en cache d'un utilisateur"""
+    with _credentials_cache_lock:
+        _credentials_cache.pop(int(user_id), None)
+
+@event.listens_for(User.sage_credentials_encrypted, 'set')
+def _invalidate_cached_credentials(user, value, oldvalue, initiator):
+    """Oublie les credentials en cache dès qu'ils sont modifiés (connexion, refresh, déconnexion)"""
+    if user.id is not None:
+        invalidate_cached_credentials(user.id)
+
+# Réponses déjà produites pour une consultation identique (même utilisateur,
+# même agent, même message, mêmes derniers messages)
+RESPONSE_CACHE_TTL_SECONDS = 3600
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+_response_cache = ResponseCache(RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES)
+
+# Une demande contenant l'un de ces mots peut modifier des données: jamais mise en cache
+MUTATING_KEYWORDS = (
+    'créer', 'ajouter', 'modifier', 'supprimer', 'import', 'saisir',
+    'enregistrer', 'sauvegarder', 'synchroniser', 'valider'
+)
+
+DEFAULT_OPENAI_API_BASE = "https://api.openai.com/v1"
+DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
+DEFAULT_OPENAI_TIMEOUT_SECONDS = 30.0
+DEFAULT_OPENAI_MAX_TOKENS = 2000
+
+@dataclass(frozen=True)
+class LLMConfig:
+    """Configuration du LLM lue une seule fois dans l'environnement"""
+    api_key: str
+    base_url: str
+    proxy_url: str
+    timeout_s: float
+    model: str
+    max_tokens: int
+    prompt_cache: bool
+    prewarm: bool
+    
+    @classmethod
+    def from_env(cls) -> 'LLMConfig':
+        """Lit les variables OPENAI_* et de proxy"""
+        try:
+            timeout_s = float(os.getenv("OPENAI_TIMEOUT_SECONDS", DEFAULT_OPENAI_TIMEOUT_SECONDS))
+        except ValueError:
+            logger.warning("Invalid OPENAI_TIMEOUT_SECONDS - using %ss", DEFAULT_OPENAI_TIMEOUT_SECONDS)
+            timeout_s = DEFAULT_OPENAI_TIMEOUT_SECONDS
+        try:
+            max_tokens = int(os.getenv("OPENAI_MAX_TOKENS", DEFAULT_OPENAI_MAX_TOKENS))
+        except ValueError:
+            logger.warning("Invalid OPENAI_MAX_TOKENS - using %s", DEFAULT_OPENAI_MAX_TOKENS)
+            max_tokens = DEFAULT_OPENAI_MAX_TOKENS
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_API_BASE", DEFAULT_OPENAI_API_BASE),
+            proxy_url=(os.getenv("HTTPS_PROXY")
+                       or os.getenv("HTTP_PROXY")
+                       or os.getenv("ALL_PROXY")),
+            timeout_s=timeout_s,
+            model=os.getenv("OPENAI_MODEL", DEFAULT_OPENAI_MODEL),
+            max_tokens=max_tokens,
+            prompt_cache=os.getenv('OPENAI_PROMPT_CACHE', 'True').lower() == 'true',
+            prewarm=os.getenv('OPENAI_PREWARM', 'True').lower() == 'true',
+        )
+
+_LLM_CONFIG = LLMConfig.from_env()
+
+# Cache de prompt OpenAI: le préfixe statique de chaque agent (outils + prompt
+# système) est identique d'une requête à l'autre; une clé par agent regroupe
+# ces requêtes sur le même cache. Envoyée seulement à l'API OpenAI elle-même
+PROMPT_CACHE_KEY_PREFIX = 'sage-ai-agent'
+PROMPT_CACHE_ENABLED = _LLM_CONFIG.prompt_cache and _LLM_CONFIG.base_url == DEFAULT_OPENAI_API_BASE
+
+# Connexions gardées ouvertes vers l'API OpenAI entre deux requêtes
+HTTP_CLIENT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+
+# LLM partagé par tous les SageAgentManager, créé au premier appel de _get_llm
+_shared_llm = None
+_shared_llm_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _create_http_client(timeout_s: float, proxy_url: str = None):
+    """
+    Client httpx du LLM: pool de connexions keep-alive, HTTP/2 si disponible
+    
+    Un seul client par configuration: tous les ChatOpenAI du processus
+    (agents, classification des actions) partagent le même pool.
+    """
+    # Use HTTPTransport with proxy (modern httpx 0.28+ pattern)
+    transport = httpx.HTTPTransport(proxy=proxy_url, http2=HTTP2_AVAILABLE, limits=HTTP_CLIENT_LIMITS)
+    http_client = httpx.Client(transport=transport, timeout=timeout_s)
+    # Fermer proprement les connexions à l'arrêt du processus
+    atexit.register(http_client.close)
+    return http_client
+
+@lru_cache(maxsize=None)
+def _create_async_http_client(timeout_s: float, proxy_url: str = None):
+    """Client httpx asynchrone du LLM, utilisé uniquement depuis la boucle de run_async"""
+    transport = httpx.AsyncHTTPTransport(proxy=proxy_url, http2=HTTP2_AVAILABLE, limits=HTTP_CLIENT_LIMITS)
+    http_client = httpx.AsyncClient(transport=transport, timeout=timeout_s)
+    atexit.register(_close_async_http_client, http_client)
+    return http_client
+
+def _close_async_http_client(http_client):
+    """Ferme les connexions du client asynchrone sur sa boucle, si elle a servi"""
+    loop = _async_loop
+    if loop is None or not loop.is_running():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(http_client.aclose(), loop).result(timeout=5)
+    except Exception as e:
+        logger.debug("Could not close async HTTP client: %s", e)
+
+# Boucle asyncio unique, dans un thread dédié: les connexions du client httpx
+# asynchrone restent attachées à cette boucle et sont réutilisées d'un appel
+# à l'autre (asyncio.run créerait et fermerait une boucle à chaque fois)
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+def _get_async_loop():
+    """Retourne la boucle partagée, démarrée au premier appel"""
+    global _async_loop
+    if _async_loop is None:
+        with _async_loop_lock:
+            if _async_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='sage-agent-loop', daemon=True).start()
+                _async_loop = loop
+    return _async_loop
+
+async def _in_app_context(app, coro):
+    """Attend coro dans le contexte d'application Flask de l'appelant (accès à la base)"""
+    if app is None:
+        return await coro
+    with app.app_context():
+        return await coro
+
+def _submit_async(coro):
+    """Lance coro sur la boucle partagée (contexte Flask de l'appelant), retourne son Future"""
+    app = current_app._get_current_object() if has_app_context() else None
+    return asyncio.run_coroutine_threadsafe(_in_app_context(app, coro), _get_async_loop())
+
+def run_async(coro):
+    """
+    Exécute une coroutine des agents depuis du code synchrone (route Flask, script)
+    et retourne son résultat
+    
+    La coroutine tourne sur la boucle partagée, avec le contexte d'application
+    Flask de l'appelant s'il y en a un.
+    """
+    return _submit_async(coro).result()
+
+def iter_async(async_iterable):
+    """
+    Parcourt un itérateur asynchrone des agents depuis du code synchrone
+    (par exemple une réponse Flask en flux), élément par élément
+    
+    L'itérateur est parcouru par une seule tâche de la boucle partagée: les
+    credentials Sage fixés dans la demande restent visibles d'un élément à
+    l'autre. Si le parcours est interrompu (client déconnecté: GeneratorExit),
+    la tâche est annulée et l'itérateur fermé (aclose), ce qui arrête l'agent.
+    """
+    items = queue.Queue()
+    end = object()
+    
+    async def pump():
+        iterator = async_iterable.__aiter__()
+        try:
+            async for item in iterator:
+                items.put(item)
+        finally:
+            aclose = getattr(iterator, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+    
+    future = _submit_async(pump())
+    future.add_done_callback(lambda _: items.put(end))
+    try:
+        while True:
+            item = items.get()
+            if item is end:
+                future.result()  # erreur éventuelle de l'itérateur
+                return
+            yield item
+    finally:
+        future.cancel()
+
+# Requête de préchauffage: ouvre la connexion TCP/TLS vers l'API avant la
+# première demande d'un utilisateur (la réponse elle-même est ignorée)
+PREWARM_TIMEOUT_SECONDS = 5.0
+
+def _prewarm_http_client(http_client, config: LLMConfig) -> None:
+    """Établit une connexion keep-alive vers l'API; un échec est sans conséquence"""
+    try:
+        http_client.get(f"{config.base_url.rstrip('/')}/models",
+                        headers={"Authorization": f"Bearer {config.api_key}"},
+                        timeout=PREWARM_TIMEOUT_SECONDS)
+        logger.debug("LLM HTTP connection pre-warmed")
+    except Exception as e:
+        logger.debug("Could not pre-warm LLM HTTP connection: %s", e)
+
+def _create_llm(config: LLMConfig = _LLM_CONFIG):
+    """Configure le ChatOpenAI et son client httpx, ou retourne None si indisponible"""
+    # Modern LangChain 0.3.x configuration (expert's Option A)
+    if not config.api_key:
+        logger.warning("OPENAI_API_KEY not found - AI agents will be unavailable")
+        return None
+    
+    try:
+        # Modern httpx client with proper proxy configuration (httpx >=0.28.1)
+        http_client = _create_http_client(config.timeout_s, config.proxy_url)
+        if config.prewarm:
+            # En tâche de fond: ne retarde pas la création du LLM
+            _agent_executor.submit(_prewarm_http_client, http_client, config)
+
+        llm = ChatOpenAI(
+            model=config.model,
+            api_key=config.api_key,
+            base_url=config.base_url,
+            http_client=http_client,
+            http_async_client=_create_async_http_client(config.timeout_s, config.proxy_url),
+            temperature=0.1,
+            # Plafond fixe: l'entrée est bornée (historique à CHAT_HISTORY_MAX_TOKENS,
+            # prompts de quelques milliers de tokens), loin de la fenêtre de contexte
+            max_tokens=config.max_tokens,
+        )
+        logger.info("Modern LLM configured (model=%s, base_url=%s, proxy=%s)",
+                    config.model, config.base_url, 'yes' if config.proxy_url else 'no')
+        return llm
+        
+    except Exception as e:
+        logger.error("Error configuring modern LLM: %s", e)
+        return None
+
+# Classification des actions planifiées (confirmation requise ou non):
+# modèle rapide, réponse d'un mot
+CLASSIFIER_MODEL = "gpt-3.5-turbo"
+CLASSIFIER_MAX_TOKENS = 10
+
+@lru_cache(maxsize=1)
+def get_classifier_llm():
+    """LLM de classification partagé, sur le pool de connexions des agents (None sans clé API)"""
+    config = _LLM_CONFIG
+    if not config.api_key:
+        return None
+    return ChatOpenAI(
+        model=CLASSIFIER_MODEL,
+        api_key=config.api_key,
+        base_url=config.base_url,
+        http_client=_create_http_client(config.timeout_s, config.proxy_url),
+        temperature=0,  # Deterministic for classification
+        max_tokens=CLASSIFIER_MAX_TOKENS,
+    )
+
+def _get_llm():
+    """Retourne le LLM partagé; un échec de configuration sera retenté à l'appel suivant"""
+    global _shared_llm
+    if _shared_llm is None:
+        # Un seul client créé même si plusieurs threads démarrent en même temps
+        with _shared_llm_lock:
+            if _shared_llm is None:
+                _shared_llm = _create_llm()
+    return _shared_llm
+
+class SageAgentManager:
+    """Gestionnaire des agents IA pour Sage Business Cloud Accounting"""
+    
+    def __init__(self):
+        logger.info("Initializing SageAgentManager...")
+        # LLM partagé par toutes les instances (client HTTP et connexions réutilisés)
+        self.llm = _get_llm()
+        self.agents_available = self.llm is not None
+        
+        # Initialiser les outils Sage (utiliser la liste existante)
+        self.sage_tools = SAGE_TOOLS
+        
+        # Outils de documents et d'analyse Excel partagés entre les instances
+        self.document_tools = DOCUMENT_TOOLS
+        self.excel_analysis_tools = EXCEL_ANALYSIS_TOOLS
+        
+        # Outils LangChain et agents sont construits au premier besoin (voir
+        # langchain_tools et _get_agent): importer le module ou créer le
+        # gestionnaire ne convertit aucun outil
+        if not self.agents_available:
+            logger.error("AI agents not configured - LLM unavailable")
+        
+        # Agents créés à la demande par _get_agent: un agent jamais sollicité
+        # ne coûte ni graphe d'outils ni exécuteur
+        self.agents = {}
+        self._agents_lock = threading.Lock()
+    
+    def warm_up(self, agent_types: tuple = WARMUP_AGENT_TYPES) -> None:
+        """Construit à l'avance les agents donnés (outils convertis, prompt, exécuteur)"""
+        for agent_type in agent_types:
+            self._get_agent(agent_type)
+    
+    @cached_property
+    def langchain_tools(self) -> list:
+        """Outils au format LangChain (conversion partagée par tous les gestionnaires)"""
+        if not self.agents_available:
+            return []
+        return _get_langchain_tools()
+    
+    @cached_property
+    def _capabilities(self) -> dict:
+        """Descriptif figé: ne dépend que du LLM et des outils configurés"""
+        return self._build_agent_capabilities()
+    
+    @cached_property
+    def _capabilities_json(self) -> str:
+        return json_dumps(self._capabilities)
+    
+    def _get_agent(self, agent_type: str):
+        """Retourne l'AgentExecutor du type demandé, créé à sa première utilisation"""
+        agent = self.agents.get(agent_type)
+        if agent is not None:
+            return agent
+        
+        prompt = AGENT_PROMPTS.get(agent_type)
+        if not prompt or not self.llm or not self.langchain_tools:
+            logger.error("Cannot create LangChain agent '%s' - missing LLM or tools", agent_type)
+            return None
+        
+        # Requêtes simultanées: l'agent n'est construit qu'une fois puis partagé
+        with self._agents_lock:
+            agent = self.agents.get(agent_type)
+            if agent is not None:
+                return agent
             
-            print(f"✅ Created {len(agents)} LangChain agents with tools")
-            return agents
+            try:
+                llm = self.llm
+                if PROMPT_CACHE_ENABLED:
+                    llm = llm.bind(extra_body={'prompt_cache_key': f'{PROMPT_CACHE_KEY_PREFIX}-{agent_type}'})
+                # API "tools": le modèle peut demander plusieurs outils dans un même tour,
+                # exécutés ensemble par AgentExecutor.ainvoke (asyncio.gather)
+                langchain_agent = create_tool_calling_agent(llm, self.langchain_tools, prompt)
+                callbacks = [FunctionCallbackHandler(logger.debug)] if logger.isEnabledFor(logging.DEBUG) else None
+                agent = AgentExecutor(agent=langchain_agent, tools=self.langchain_tools,
+                                      verbose=AGENT_VERBOSE, callbacks=callbacks)
+            except Exception as e:
+                logger.error("Error creating LangChain agent '%s': %s", agent_type, e)
+                return None
             
-        except Exception as e:
-            print(f"❌ Error creating LangChain agents: {e}")
-            return {}
+            self.agents[agent_type] = agent
+        
+        logger.info("Created LangChain agent '%s' with tools", agent_type)
+        return agent
     
-    def _create_system_prompts(self):
-        """Crée les prompts système pour différents types d'agents (sans CrewAI)"""
+    def process_user_request(self, user_message: str, user_id: int = None, conversation_context: list = None,
+                             sage_credentials: dict = None) -> str:
+        """
+        Traite une demande utilisateur avec LangChain moderne (sans CrewAI)
         
-        if not self.llm:
-            print("❌ Cannot create system prompts - LLM not available")
-            return {}
+        Pour le code synchrone: exécute aprocess_user_request sur la boucle
+        partagée, le thread appelant attend le résultat.
+        """
+        return run_async(self.aprocess_user_request(user_message, user_id, conversation_context, sage_credentials))
+    
+    async def aprocess_user_request(self, user_message: str, user_id: int = None, conversation_context: list = None,
+                                    sage_credentials: dict = None) -> str:
+        """
+        Traite une demande utilisateur (mêmes arguments, même résultat que
+        process_user_request)
+        
+        Les appels au LLM passent par le client httpx asynchrone: plusieurs
+        demandes attendent l'API OpenAI en même temps sur une seule boucle.
+        La préparation (base de données, construction des agents, historique)
+        s'exécute dans un thread, hors de cette boucle.
+        Depuis du code synchrone: process_user_request, ou
+        run_async(manager.aprocess_user_request(...)).
+        """
+        if not self.agents_available or not self.llm:
+            return AGENT_UNAVAILABLE_MESSAGE
         
         try:
-            # Les prompts Moroccan sont déjà définis dans _create_agents_langchain()
-            # Cette méthode est obsolète et ne doit plus être utilisée
-            comptable_prompt = "DEPRECATED - Use _create_agents_langchain() for Moroccan personas"
-            
-            analyste_prompt = "DEPRECATED - Use _create_agents_langchain() for Moroccan personas"
+            prepared = await self._aprepare_request(user_message, user_id, conversation_context, sage_credentials)
+            if isinstance(prepared, str):
+                return prepared
+            selected_agents, agent_payload, cache_key = prepared
             
-            # Prompt pour l'Expert Support Sage
-            support_prompt = """Vous êtes Youssef Tazi, Expert Support et Formation Sage avec 20 ans d'expérience en accompagnement d'entreprises marocaines.
-                
-                🎓 PROFIL PROFESSIONNEL:
-                • Ingénieur en Informatique de Gestion - ENSIAS Rabat (2004)
-                • 20 ans d'expertise en formation et support ERP/comptabilité
-                • Formateur certifié Sage Business Cloud Accounting
-                • Spécialiste en digitalisation comptable des PME marocaines
-                • Consultant en transformation numérique secteur privé/public
-                
-                🏭 EXPERTISE SECTEUR MAROCAIN:
-                • Accompagnement de 500+ entreprises marocaines (TPE à GE)
-                • Spécialisation par secteurs: Commerce, Industrie, Services, BTP, Textile, Hôtellerie-Restauration
-                • Maîtrise des spécificités réglementaires marocaines
-                • Formation adaptée aux profils comptables locaux
-                • Support multilingue: Français, Arabe, Tamazight
-                
-                🔧 COMPÉTENCES TECHNIQUES SAGE:
-                • Configuration Sage pour environnement marocain (MAD, TVA, IS)
-                • Paramétrage plan comptable selon CGNC
-                • Personnalisation des états et rapports officiels
-                • Intégration bancaire avec banques marocaines
-                • Liaisons fiscales automatisées (SIMPL-TVA, SIMPL-IS)
-                • Workflows d'approbation adaptés aux organisations locales
-                
-                📚 FORMATION ET PÉDAGOGIE:
-                • Méthodes pédagogiques adaptées au contexte marocain
-                • Cas pratiques basés sur entreprises réelles locales
-                • Formation progressive: Débutant → Expert
-                • Support post-formation et hotline dédiée
-                • Documentation technique en français et arabe
-                • Vidéos tutoriels contextualisés Maroc
-                
-                🔍 DIAGNOSTIC ET RÉSOLUTION:
-                • Audit technique des installations Sage
-                • Optimisation des performances selon infrastructure locale
-                • Migration de données depuis logiciels marocains
-                • Connectivité et synchronisation multi-sites
-                • Sécurité et sauvegarde adaptées aux risques locaux
-                • Conformité RGPD et législation marocaine données
-                
-                APPROCHE MÉTHODOLOGIQUE:
-                Je privilégie une approche progressive et bienveillante:
-                1. Écoute active des besoins et contraintes spécifiques
-                2. Diagnostic technique et fonctionnel complet
-                3. Plan de formation personnalisé et réaliste
-                4. Accompagnement pratique avec cas concrets
-                5. Suivi post-formation et support continu
-                
-                IMPORTANT: Démontrez les fonctionnalités Sage en intégrant les spécificités marocaines."""
+            if len(selected_agents) > 1:
+                result_str = await self._arun_agents_concurrently(selected_agents, agent_payload)
+            else:
+                result_str = await self._arun_agent(next(iter(selected_agents.values())), agent_payload)
             
-            return {
-                'comptable': comptable_prompt,
-                'analyste': analyste_prompt,
-                'support': support_prompt
-            }
+            return self._finish_request(result_str, cache_key)
             
         except Exception as e:
-            print(f"❌ Error creating system prompts: {e}")
-            return {}
+            logger.error("Error in aprocess_user_request: %s", e)
+            return REQUEST_ERROR_MESSAGE.format(error=e)
     
-    def process_user_request(self, user_message: str, user_id: int = None, conversation_context: list = None) -> str:
-        """Traite une demande utilisateur avec LangChain moderne (sans CrewAI)"""
+    async def astream_user_request(self, user_message: str, user_id: int = None, conversation_context: list = None,
+                                   sage_credentials: dict = None):
+        """
+        Comme aprocess_user_request, mais produit la réponse au fil de sa
+        génération au lieu de l'attendre en entier
         
-        # Check if LLM is available
+        Produit des paires (STREAM_DELTA, fragment de texte), puis une seule
+        paire (STREAM_RESULT, réponse finale): la sortie de l'agent, sans le
+        texte des tours intermédiaires (avant un appel d'outil). Les réponses
+        en cache, les erreurs et les consultations multi-agents arrivent en
+        un seul fragment. Une action planifiée reste sous forme de texte
+        (marqueur PLANNED_ACTION): à l'appelant de la traiter.
+        """
         if not self.agents_available or not self.llm:
-            return "❌ L'agent IA n'est pas disponible. Veuillez vérifier que la clé OpenAI API est configurée."
+            yield STREAM_DELTA, AGENT_UNAVAILABLE_MESSAGE
+            yield STREAM_RESULT, AGENT_UNAVAILABLE_MESSAGE
+            return
         
         try:
-            # Récupérer les credentials Sage de l'utilisateur
-            sage_credentials = None
-            if user_id:
-                try:
-                    from src.models.user import User
-                    user = User.query.get(user_id)
-                    if user and hasattr(user, 'sage_credentials_encrypted') and user.sage_credentials_encrypted:
-                        sage_credentials = user.get_sage_credentials()
-                except Exception as e:
-                    print(f"Warning: Could not get user credentials: {e}")
-            
-            # Injecter les credentials dans les outils Sage
-            if sage_credentials:
-                try:
-                    from src.tools.sage_tools import set_user_credentials
-                    set_user_credentials(sage_credentials)
-                except Exception as e:
-                    print(f"Warning: Could not set Sage credentials: {e}")
-            
-            # Analyser le message pour déterminer l'agent approprié  
-            agent_type = self._determine_agent_type(user_message)
-            selected_agent = self.agents.get(agent_type)
-            
-            if not selected_agent:
-                return f"❌ Agent '{agent_type}' non disponible."
+            prepared = await self._aprepare_request(user_message, user_id, conversation_context, sage_credentials)
+            if isinstance(prepared, str):
+                yield STREAM_DELTA, prepared
+                yield STREAM_RESULT, prepared
+                return
+            selected_agents, agent_payload, cache_key = prepared
             
-            # Créer le contexte de la tâche avec les credentials
-            task_context = self._build_task_context(user_message, conversation_context, user_id, sage_credentials)
-            
-            # Construire l'input pour l'agent LangChain avec contexte
-            agent_input = f"""Contexte utilisateur: {task_context}
-            
-            Demande: {user_message}
-            
-            Instructions:
-            1. Analysez la demande de l'utilisateur
-            2. Si la demande concerne un document (analyse, extraction, import), utilisez d'abord les outils de traitement de documents appropriés  
-            3. Utilisez ensuite les outils Sage nécessaires pour répondre à la demande
-            4. IMPORTANT: Si la demande implique une CRÉATION, MODIFICATION ou SUPPRESSION dans Sage (clients, factures, produits, etc.), 
-               NE PAS exécuter l'action immédiatement. Au lieu de cela:
-               - Préparez le plan d'action détaillé
-               - Expliquez exactement ce que vous allez faire
-               - Terminez par: "PLANNED_ACTION: [type:create_client/create_invoice/etc.] [description:détails de l'action]"
-            5. Pour les CONSULTATIONS (lister, afficher, rechercher), utilisez directement les outils Sage sans demander confirmation
-            6. Fournissez une réponse complète et professionnelle
-            7. Si vous analysez des documents, fournissez un résumé des données extraites et leur qualité
-            
-            
-            IMPORTANT: Répondez en tant qu'expert-comptable marocain selon votre persona:
-            - Ahmed Benali (comptable) : Expert-Comptable avec 20 ans d'expérience au Maroc
-            - Fatima El Fassi (analyste) : Analyste Financière Senior spécialisée Maroc  
-            - Youssef Tazi (support) : Expert Support Sage contextualisé PME marocaines
-            Montrez votre expertise locale (TVA, CGNC, CNSS, etc.) dans vos réponses.
-            
-            Répondez de manière claire et structurée en français.
-            """
-            
-            # Construire l'historique de conversation pour LangChain
-            chat_history = []
-            if conversation_context:
-                for msg in conversation_context:
-                    if msg['role'] == 'user':
-                        chat_history.append(HumanMessage(content=msg['content']))
-                    else:
-                        chat_history.append(SystemMessage(content=msg['content']))
-            
-            # Exécuter l'agent LangChain avec les outils et l'historique
-            result = selected_agent.invoke({
-                "input": agent_input,
-                "chat_history": chat_history
-            })
-            
-            result_str = result.get('output', str(result))
-            
-            # Check if the agent planned an action instead of executing it
-            if "PLANNED_ACTION:" in result_str:
-                return self.parse_planned_action(result_str)
+            if len(selected_agents) > 1:
+                result_str = await self._arun_agents_concurrently(selected_agents, agent_payload)
+                yield STREAM_DELTA, result_str
+            else:
+                agent = next(iter(selected_agents.values()))
+                result_str = None
+                async for event in agent.astream_events(agent_payload, version="v2"):
+                    if event["event"] == "on_chat_model_stream":
+                        content = event["data"]["chunk"].content
+                        if content and isinstance(content, str):
+                            yield STREAM_DELTA, content
+                    elif event["event"] == "on_chain_end" and not event.get("parent_ids"):
+                        # Fin de l'AgentExecutor lui-même: réponse finale complète
+                        result_str = self._agent_output(event["data"].get("output"))
+                if result_str is None:
+                    raise RuntimeError("Aucune réponse finale de l'agent")
             
-            return result_str
+            if cache_key and "PLANNED_ACTION:" not in result_str:
+                _response_cache.set(cache_key, result_str)
             
         except Exception as e:
-            error_msg = f"Erreur lors du traitement de votre demande: {str(e)}. Veuillez réessayer ou reformuler votre question."
-            print(f"❌ Error in process_user_request: {e}")
-            return error_msg
+            logger.error("Error in astream_user_request: %s", e)
+            result_str = REQUEST_ERROR_MESSAGE.format(error=e)
+            yield STREAM_DELTA, result_str
+        
+        yield STREAM_RESULT, result_str
+    
+    async def process_user_requests_batch(self, messages: list, concurrency: int = BATCH_CONCURRENCY) -> list:
+        """
+        Traite plusieurs demandes en parallèle, au plus `concurrency` à la fois
+        
+        messages: liste de dicts d'arguments de aprocess_user_request
+        (user_message, user_id, conversation_context). Les réponses sont
+        retournées dans le même ordre; une demande en échec donne son exception.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def process_one(message):
+            async with semaphore:
+                return await self.aprocess_user_request(**message)
+        
+        return await asyncio.gather(*(process_one(message) for message in messages), return_exceptions=True)
+    
+    async def _aprepare_request(self, user_message: str, user_id: int = None, conversation_context: list = None,
+                                sage_credentials: dict = None):
+        """
+        _prepare_request dans un thread: une lecture lente en base ou la
+        construction d'un agent ne bloque pas les autres demandes de la boucle
+        
+        Les credentials sont ensuite injectés dans la tâche de la demande.
+        """
+        # Récupérer les credentials Sage de l'utilisateur
+        if sage_credentials is None and user_id:
+            try:
+                sage_credentials = await asyncio.to_thread(self._get_user_sage_credentials, user_id)
+            except Exception as e:
+                logger.warning("Could not get user credentials: %s", e)
+        
+        # Injecter les credentials dans les outils Sage: ContextVar de la tâche
+        # de cette demande, que les agents lancés en parallèle et leurs outils
+        # héritent (les autres demandes sur la boucle gardent les leurs)
+        if sage_credentials:
+            try:
+                set_user_credentials(sage_credentials)
+            except Exception as e:
+                logger.warning("Could not set Sage credentials: %s", e)
+        
+        return await asyncio.to_thread(self._prepare_request, user_message, user_id,
+                                       conversation_context, sage_credentials)
+    
+    def _prepare_request(self, user_message: str, user_id: int = None, conversation_context: list = None,
+                         sage_credentials: dict = None):
+        """
+        Étapes communes avant l'appel au LLM: choix des agents, cache de
+        réponses et construction de l'entrée des agents (code bloquant:
+        appelé via _aprepare_request)
+        
+        Retourne soit la réponse finale (str: agent indisponible, réponse en
+        cache), soit (agents sélectionnés, entrée des agents, clé de cache).
+        """
+        # Analyser le message pour déterminer l'agent approprié  
+        is_consultation = self._is_cacheable_request(user_message)
+        agent_types = self._determine_agent_types(user_message)
+        if not is_consultation:
+            # Une modification n'est planifiée que par un seul agent
+            agent_types = agent_types[:1]
+        agent_type = agent_types[0]
+        selected_agent = self._get_agent(agent_type)
+        
+        if not selected_agent:
+            return f"❌ Agent '{agent_type}' non disponible."
+        
+        # Agents secondaires: ignorés s'ils ne peuvent pas être créés
+        selected_agents = {agent_type: selected_agent}
+        for other_type in agent_types[1:]:
+            other_agent = self._get_agent(other_type)
+            if other_agent:
+                selected_agents[other_type] = other_agent
+        
+        # Consultation déjà traitée: réponse servie sans appel au LLM
+        cache_key = None
+        if is_consultation:
+            recent_context = (conversation_context or [])[-RECENT_CONTEXT_MESSAGES:]
+            cache_key = make_cache_key(user_id, list(selected_agents), bool(sage_credentials),
+                                       user_message, recent_context)
+            cached_response = _response_cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
+        
+        # Créer le contexte de la tâche avec les credentials
+        task_context = self._build_task_context(user_message, conversation_context, user_id, sage_credentials)
+        
+        # Construire l'input pour l'agent LangChain avec contexte
+        agent_input = AGENT_INPUT_TEMPLATE.format(task_context=task_context, user_message=user_message)
+        
+        agent_payload = {
+            "input": agent_input,
+            # Historique de conversation pour LangChain, borné en tokens
+            "chat_history": _build_chat_history(conversation_context)
+        }
+        return selected_agents, agent_payload, cache_key
+    
+    def _finish_request(self, result_str: str, cache_key: str = None):
+        """Action planifiée ou réponse textuelle, mise en cache s'il s'agit d'une consultation"""
+        # Check if the agent planned an action instead of executing it
+        if "PLANNED_ACTION:" in result_str:
+            # Une action planifiée attend une confirmation: jamais rejouée depuis le cache
+            return self.parse_planned_action(result_str)
+        
+        if cache_key:
+            _response_cache.set(cache_key, result_str)
+        
+        return result_str
+    
+    @staticmethod
+    def _agent_output(result) -> str:
+        """Réponse textuelle d'un AgentExecutor"""
+        # str(result) sérialise aussi l'historique et les étapes intermédiaires:
+        # seulement en dernier recours, pas comme valeur par défaut évaluée à chaque appel
+        output = result.get('output') if isinstance(result, dict) else None
+        return output if isinstance(output, str) else str(result)
+    
+    async def _arun_agent(self, agent, agent_payload: dict) -> str:
+        """Exécute un AgentExecutor et retourne sa réponse textuelle"""
+        return self._agent_output(await agent.ainvoke(agent_payload))
+    
+    async def _arun_agents_concurrently(self, agents: dict, agent_payload: dict) -> str:
+        """
+        Exécute plusieurs agents en parallèle et juxtapose leurs réponses
+        
+        L'échec (ou le dépassement de MULTI_AGENT_TIMEOUT_SECONDS) d'un agent
+        n'écarte que sa réponse; l'erreur n'est levée que si tous échouent.
+        """
+        futures = {
+            agent_type: asyncio.ensure_future(self._arun_agent(agent, agent_payload))
+            for agent_type, agent in agents.items()
+        }
+        await asyncio.wait(futures.values(), timeout=MULTI_AGENT_TIMEOUT_SECONDS)
+        return self._join_agent_sections(futures)
+    
+    def _join_agent_sections(self, futures: dict) -> str:
+        """Juxtapose les réponses des agents terminés"""
+        sections = []
+        last_error = None
+        for agent_type, future in futures.items():
+            if not future.done():
+                future.cancel()
+                logger.warning("Agent '%s' timed out after %ss", agent_type, MULTI_AGENT_TIMEOUT_SECONDS)
+                continue
+            try:
+                sections.append(f"## {AGENT_DISPLAY_NAMES[agent_type]}\n\n{future.result()}")
+            except Exception as e:
+                last_error = e
+                logger.warning("Agent '%s' failed: %s", agent_type, e)
+        
+        if not sections:
+            raise last_error or TimeoutError("Aucun agent n'a répondu à temps")
+        return "\n\n".join(sections)
+    
+    def _get_user_sage_credentials(self, user_id: int):
+        """Credentials Sage de l'utilisateur, relus en base au plus toutes les CREDENTIALS_CACHE_TTL_SECONDS"""
+        user_id = int(user_id)  # même clé que user.id dans _invalidate_cached_credentials
+        now = time.monotonic()
+        with _credentials_cache_lock:
+            cached = _credentials_cache.get(user_id)
+        if cached and cached[0] > now:
+            credentials = cached[1]
+        else:
+            # Lecture et déchiffrement hors du verrou
+            credentials = None
+            user = User.query.get(user_id)
+            if user and user.sage_credentials_encrypted:
+                credentials = user.get_sage_credentials()
+            with _credentials_cache_lock:
+                if len(_credentials_cache) >= CREDENTIALS_CACHE_MAX_USERS:
+                    _credentials_cache.clear()
+                _credentials_cache[user_id] = (now + CREDENTIALS_CACHE_TTL_SECONDS, credentials)
+        
+        # Copie: les outils ne doivent pas modifier l'entrée en cache
+        return dict(credentials) if credentials else None
+    
+    def invalidate_credentials(self, user_id: int) -> None:
+        """Force la relecture des credentials Sage de l'utilisateur au prochain message"""
+        invalidate_cached_credentials(user_id)
+    
+    def _is_cacheable_request(self, user_message: str) -> bool:
+        """Vrai si la demande est une simple consultation (aucun mot-clé de modification)"""
+        message_lower = user_message.lower()
+        return not any(keyword in message_lower for keyword in MUTATING_KEYWORDS)
     
     def _determine_agent_type(self, user_message: str) -> str:
         """Détermine quel agent utiliser selon le message"""
-        message_lower = user_message.lower()
+        return self._determine_agent_types(user_message)[0]
+    
+    def _determine_agent_types(self, user_message: str) -> list:
+        """
+        Agents concernés par le message, le principal en premier
         
-        # Mots-clés pour l'agent comptable (opérations + documents)
-        comptable_keywords = [
-            'créer', 'ajouter', 'nouveau', 'client', 'facture', 'produit', 'fournisseur',
-            'saisir', 'enregistrer', 'modifier', 'supprimer', 'import', 'importer',
-            'document', 'pdf', 'csv', 'excel', 'fichier', 'analyser', 'extraire',
-            'upload', 'télécharger', 'scanner', 'ocr'
-        ]
-        
-        # Mots-clés pour l'analyste financier (rapports + validation)
-        analyste_keywords = [
-            'bilan', 'compte de résultat', 'rapport', 'analyse', 'kpi', 'performance',
-            'chiffre d\'affaires', 'bénéfice', 'perte', 'marge', 'rentabilité',
-            'transaction', 'recherche', 'historique', 'valider', 'validation',
-            'vérifier', 'contrôle', 'cohérence', 'qualité'
-        ]
-        
-        # Mots-clés pour le support (aide + formation)
-        support_keywords = [
-            'aide', 'comment', 'expliquer', 'formation', 'apprendre', 'tutoriel',
-            'problème', 'erreur', 'bug', 'ne fonctionne pas', 'assistance',
-            'guide', 'procédure', 'étapes', 'configuration'
-        ]
-        
-        # Compter les correspondances
-        comptable_score = sum(1 for keyword in comptable_keywords if keyword in message_lower)
-        analyste_score = sum(1 for keyword in analyste_keywords if keyword in message_lower)
-        support_score = sum(1 for keyword in support_keywords if keyword in message_lower)
-        
-        # Déterminer l'agent avec le score le plus élevé
-        if comptable_score >= analyste_score and comptable_score >= support_score:
-            return 'comptable'
-        elif analyste_score >= support_score:
-            return 'analyste'
-        else:
-            return 'support'
+        Les autres agents dont le score (non nul) est à MULTI_AGENT_SCORE_MARGIN
+        du principal sont ajoutés: la demande couvre plusieurs domaines.
+        """
+        # Le routage ne dépend que du texte en minuscules: messages courts mémorisés
+        message_lower = user_message.lower()
+        if len(message_lower) <= ROUTING_CACHE_MAX_MESSAGE_CHARS:
+            return list(_cached_route_agent_types(message_lower))
+        return list(_route_agent_types(message_lower))
     
     def _detect_sage_requirement(self, user_message: str, conversation_context: list = None) -> bool:
         """Détermine intelligemment si Sage est requis pour cette demande"""
-        message_lower = user_message.lower()
-        
-        # Indicateurs FORTS que Sage est nécessaire (opérations dans Sage)
-        sage_required_keywords = [
-            'créer dans sage', 'ajouter dans sage', 'sauvegarder dans sage',
-            'importer dans sage', 'synchroniser avec sage', 'connecter sage',
-            'get_customers', 'create_invoice', 'get_balance_sheet', 
-            'clients sage', 'factures sage', 'produits sage',
-            'données sage', 'sage business cloud', 'mes données sage',
-            'lister mes clients', 'mes factures', 'mon bilan',
-            'créer un client', 'créer une facture', 'créer un produit'
-        ]
-        
-        # Indicateurs que l'utilisateur travaille EN LOCAL (pas besoin de Sage)
-        local_work_keywords = [
-            'fichier attaché', 'document attaché', 'excel attaché',
-            'analyser ce fichier', 'calculer la tva', 'tva collectée',
-            'tableau excel', 'feuille excel', 'grand livre',
-            'analyse document', 'extraction données', 'validation fichier',
-            'période de', 'mois de', 'calcul pour', 'données du fichier',
-            'fichiers analysés', 'document analysé'
-        ]
-        
-        # Vérifier les indicateurs Sage requis
-        sage_score = sum(1 for keyword in sage_required_keywords if keyword in message_lower)
-        
-        # Vérifier les indicateurs de travail local
-        local_score = sum(1 for keyword in local_work_keywords if keyword in message_lower)
+        scores = _SAGE_REQUIREMENT_MATCHER.scores(user_message)
+        sage_score = scores['sage']
+        local_score = scores['local']
         
         # Examiner le contexte de conversation pour des fichiers attachés
-        has_attached_files = False
-        if conversation_context:
-            for msg in conversation_context[-3:]:  # Derniers 3 messages
-                if 'fichiers analysés' in msg.get('content', '').lower():
-                    has_attached_files = True
-                    break
+        has_attached_files = bool(conversation_context) and any(
+            ATTACHED_FILES_MARKER in msg.get('content', '').lower()
+            for msg in conversation_context[-ATTACHED_FILES_LOOKBACK:]  # Derniers 3 messages
+        )
         
         # Logique de décision
         if local_score > 0 or has_attached_files:
-            print(f"🔍 DEBUG: Travail LOCAL détecté (score: {local_score}, fichiers: {has_attached_files})")
+            logger.debug("Travail LOCAL détecté (score: %d, fichiers: %s)", local_score, has_attached_files)
             return False  # Pas besoin de Sage
         
         if sage_score > 0:
-            print(f"🔍 DEBUG: Sage REQUIS détecté (score: {sage_score})")
+            logger.debug("Sage REQUIS détecté (score: %d)", sage_score)
             return True  # Sage nécessaire
         
         # Par défaut : questions générales ne nécessitent pas Sage
-        general_questions = [
-            'comment', 'qu\'est-ce', 'expliquer', 'aide', 'définir',
-            'différence', 'avantage', 'procédure', 'méthode'
-        ]
-        
-        general_score = sum(1 for keyword in general_questions if keyword in message_lower)
+        general_score = scores['general']
         if general_score > 0:
-            print(f"🔍 DEBUG: Question générale détectée (score: {general_score})")
+            logger.debug("Question générale détectée (score: %d)", general_score)
             return False  # Pas besoin de Sage pour questions générales
         
         # Cas ambigus : par défaut ne pas exiger Sage
-        print("🔍 DEBUG: Cas ambigu - pas d'exigence Sage par défaut")
+        logger.debug("Cas ambigu - pas d'exigence Sage par défaut")
         return False
     
     def _build_task_context(self, user_message: str, conversation_context: list = None, user_id: int = None, sage_credentials: dict = None) -> str:
         """Construit le contexte pour la tâche de l'agent"""
-        context_parts = []
-        
-        # Détecter si l'utilisateur a réellement besoin de Sage ou peut utiliser les outils locaux
-        needs_sage = self._detect_sage_requirement(user_message, conversation_context)
-        
-        # Ajouter les credentials Sage si disponibles
+        # Ajouter les credentials Sage si disponibles; sinon détecter si l'utilisateur
+        # a réellement besoin de Sage ou peut utiliser les outils locaux
         if sage_credentials:
-            context_parts.append("✅ CONNEXION SAGE ACTIVE - Vous êtes connecté à Sage Business Cloud Accounting")
-            context_parts.append("🔧 OUTILS DISPONIBLES - Utilisez directement les outils Sage (get_customers, create_invoice, get_balance_sheet, etc.) sans demander d'identifiants")
-            context_parts.append("📋 INSTRUCTIONS - Répondez directement aux demandes en utilisant les outils Sage appropriés")
+            context_parts = list(SAGE_CONNECTED_CONTEXT)
+        elif self._detect_sage_requirement(user_message, conversation_context):
+            context_parts = list(SAGE_REQUIRED_CONTEXT)
         else:
-            if needs_sage:
-                context_parts.append("⚠️ CONNEXION SAGE REQUISE - Cette demande nécessite une connexion à Sage Business Cloud Accounting")
-                context_parts.append("🔗 Pour vous connecter à Sage, utilisez la section 'Connexion Sage' de l'interface")
-            else:
-                context_parts.append("💡 MODE ANALYSE LOCAL - Vous pouvez analyser vos documents sans connexion Sage")
-                context_parts.append("🔧 OUTILS DISPONIBLES - Analyse de documents, calculs TVA, exploration Excel")
-                context_parts.append("📋 INSTRUCTIONS - Utilisez les outils d'analyse locale (tva_collectee_officielle, document_analysis, excel_data_explorer)")
-                context_parts.append("💬 Si vous souhaitez interagir avec Sage plus tard, connectez-vous via l'interface")
+            context_parts = list(LOCAL_ANALYSIS_CONTEXT)
         
         if user_id:
             context_parts.append(f"Utilisateur ID: {user_id}")
         
         if conversation_context:
             # Prendre les 3 derniers échanges pour le contexte
-            recent_context = conversation_context[-6:] if len(conversation_context) > 6 else conversation_context
             context_parts.append("Contexte de conversation récent:")
-            for msg in recent_context:
-                role = "Utilisateur" if msg.get('role') == 'user' else "Assistant"
-                content = msg.get('content', '')[:200] + "..." if len(msg.get('content', '')) > 200 else msg.get('content', '')
-                context_parts.append(f"- {role}: {content}")
+            context_parts.extend(
+                f"- {'Utilisateur' if msg.get('role') == 'user' else 'Assistant'}: {_shorten_context_message(msg.get('content'))}"
+                for msg in conversation_context[-RECENT_CONTEXT_MESSAGES:]
+            )
         
         return "\n".join(context_parts) if context_parts else "Nouvelle conversation"
     
     def get_agent_capabilities(self) -> dict:
-        """Retourne les capacités de chaque agent"""
+        """Retourne les capacités de chaque agent (calculées une fois, au premier appel)"""
+        return self._capabilities
+    
+    def get_agent_capabilities_json(self) -> str:
+        """Capacités de chaque agent sérialisées en JSON (une seule fois, pour la route de statut)"""
+        return self._capabilities_json
+    
+    def _build_agent_capabilities(self) -> dict:
+        """Construit le descriptif des capacités de chaque agent"""
         if not self.agents_available:
             return {
                 'status': 'unavailable',
@@ -642,77 +1207,41 @@ class SageAgentManager:
                 'support': {'tools': 0}
             }
         
-        return {
-            'status': 'available',
-            'comptable': {
-                'description': 'Assistant Comptable Expert',
-                'capabilities': [
-                    'Gestion des clients et fournisseurs',
-                    'Création et traitement des factures',
-                    'Gestion du catalogue produits',
-                    'Analyse automatique de documents (PDF, images, CSV, Excel)',
-                    'Extraction de données de factures',
-                    'Import en masse de clients et produits',
-                    'Validation et contrôle de données'
-                ],
-                'tools': len(self.sage_tools + self.document_tools) if self.agents else 0
-            },
-            'analyste': {
-                'description': 'Analyste Financier Senior',
-                'capabilities': [
-                    'Génération de bilans comptables',
-                    'Création de comptes de résultat',
-                    'Calcul de KPIs financiers',
-                    'Recherche et analyse de transactions',
-                    'Validation de qualité des données extraites',
-                    'Recommandations financières'
-                ],
-                'tools': (len(self.sage_tools) + 2) if self.agents else 0
-            },
-            'support': {
-                'description': 'Expert Support Sage',
-                'capabilities': [
-                    'Formation et accompagnement utilisateurs',
-                    'Résolution de problèmes techniques',
-                    'Guide d\'utilisation des fonctionnalités',
-                    'Assistance traitement de documents',
-                    'Bonnes pratiques comptables',
-                    'Optimisation des workflows'
-                ],
-                'tools': 5 if self.agents else 0
-            }
+        available = self.is_available()
+        tool_counts = {
+            'comptable': len(self.sage_tools) + len(self.document_tools),
+            'analyste': len(self.sage_tools) + 2,
+            'support': 5,
         }
+        capabilities = {'status': 'available'}
+        for agent_type, (description, agent_capabilities) in AGENT_PROFILES.items():
+            capabilities[agent_type] = {
+                'description': description,
+                'capabilities': list(agent_capabilities),
+                'tools': tool_counts[agent_type] if available else 0
+            }
+        return capabilities
     
     def is_available(self) -> bool:
         """Check if agents are available"""
-        return self.agents_available and len(self.agents) > 0
+        return self.agents_available and len(self.langchain_tools) > 0
     
     def parse_planned_action(self, result_str: str) -> dict:
         """Parse the agent response to extract planned action details"""
-        import re
-        
-        # Find the PLANNED_ACTION marker
-        action_match = re.search(r'PLANNED_ACTION:\s*\[type:(.*?)\]\s*\[description:(.*?)\]', result_str)
+        # Réponses identiques (prompts déterministes): analyse servie depuis le cache
+        parsed = cached_parse_planned_action(result_str)
         
-        if action_match:
-            action_type = action_match.group(1).strip()
-            action_description = action_match.group(2).strip()
-            
-            # Extract the main response (everything before PLANNED_ACTION)
-            main_response = result_str.split('PLANNED_ACTION:')[0].strip()
-            
-            # Extract details if possible
-            details = self.extract_action_details(main_response, action_type)
-            
+        if parsed:
+            # Dict neuf à chaque appel: les routes le complètent et le sérialisent
             return {
-                'response': main_response,
+                'response': parsed.response,
                 'agent_type': 'comptable_with_confirmation',
                 'capabilities_used': ['analysis', 'sage_planning'],
                 'success': True,
                 'planned_action': {
-                    'type': action_type,
-                    'description': action_description,
-                    'details': details
+                    'type': parsed.action_type,
+                    'description': parsed.description,
+                    'details': dict(parsed.details)
                 }
             }
         
@@ -724,87 +1253,41 @@ class SageAgentManager:
             'success': True
         }
     
+    def parse_planned_actions_batch(self, results: list) -> list:
+        """
+        parse_planned_action pour plusieurs réponses d'agent, dans le même ordre
+        
+        Chaque réponse est analysée à partir de son propre marqueur; les réponses
+        identiques du lot (ou déjà vues) sont servies par le cache d'analyse.
+        """
+        return [self.parse_planned_action(result_str) for result_str in results]
+    
     def extract_action_details(self, response: str, action_type: str) -> dict:
         """Extract specific details from the agent response based on action type"""
-        details = {}
-        
-        response_lower = response.lower()
-        
-        # Extract client details
-        if 'client' in action_type:
-            if 'nom' in response_lower or 'client' in response_lower:
-                # Try to extract client name
-                import re
-                name_patterns = [
-                    r'client[:\s]*([^\n]+)',
-                    r'nom[:\s]*([^\n]+)',
-                    r'pour\s+([A-Za-z\s]+)',
-                ]
-                for pattern in name_patterns:
-                    match = re.search(pattern, response, re.IGNORECASE)
-                    if match:
-                        details['client_name'] = match.group(1).strip()
-                        break
-        
-        # Extract invoice details
-        elif 'invoice' in action_type or 'facture' in action_type:
-            import re
-            # Extract amounts
-            amount_match = re.search(r'(\d+(?:,\d+)?(?:\.\d+)?)\s*€', response)
-            if amount_match:
-                details['amount'] = amount_match.group(1)
-            
-            # Extract client for invoice
-            client_patterns = [
-                r'pour\s+([A-Za-z\s]+)',
-                r'client[:\s]*([^\n]+)',
-            ]
-            for pattern in client_patterns:
-                match = re.search(pattern, response, re.IGNORECASE)
-                if match:
-                    details['client_name'] = match.group(1).strip()
-                    break
-        
-        # Extract product details
-        elif 'product' in action_type or 'produit' in action_type:
-            import re
-            # Extract product name
-            prod_patterns = [
-                r'produit[:\s]*([^\n]+)',
-                r'nom[:\s]*([^\n]+)',
-            ]
-            for pattern in prod_patterns:
-                match = re.search(pattern, response, re.IGNORECASE)
-                if match:
-                    details['product_name'] = match.group(1).strip()
-                    break
-            
-            # Extract price
-            price_match = re.search(r'prix[:\s]*(\d+(?:,\d+)?(?:\.\d+)?)\s*€', response, re.IGNORECASE)
-            if price_match:
-                details['price'] = price_match.group(1)
-        
-        return details
+        return extract_action_details(response, action_type)
+
+@lru_cache(maxsize=1)
+def get_sage_manager() -> SageAgentManager:
+    """Gestionnaire partagé par les routes et la classe de compatibilité (créé au premier appel)"""
+    manager = SageAgentManager()
+    if manager.agents_available:
+        # Préconstruire l'agent le plus sollicité sans retarder le démarrage
+        _agent_executor.submit(manager.warm_up)
+    return manager
 
 # Classe de compatibilité pour l'ancien code
 class SageAccountingAgent:
     """Classe de compatibilité pour l'ancien code"""
     
     def __init__(self):
-        self.manager = SageAgentManager()
+        self.manager = get_sage_manager()
+        
+        # Méthodes du gestionnaire liées une seule fois: un appel ne repasse
+        # ni par self.manager ni par une méthode intermédiaire
+        self.get_agent_capabilities = self.manager.get_agent_capabilities
+        self.determine_agent_type = self.manager._determine_agent_type
+        self.is_available = self.manager.is_available
     
     def execute_task(self, user_message: str, credentials: dict, business_id: str = None, agent_type: str = "accounting") -> str:
         """Méthode de compatibilité"""
         return self.manager.process_user_request(user_message)
-    
-    def get_agent_capabilities(self) -> dict:
-        """Méthode de compatibilité"""
-        return self.manager.get_agent_capabilities()
-    
-    def determine_agent_type(self, user_message: str) -> str:
-        """Méthode de compatibilité"""
-        return self.manager._determine_agent_type(user_message)
-    
-    def is_available(self) -> bool:
-        """Check if agents are available"""
-        return self.manager.is_available()
\ No newline at end of file
@@ -2,8 +2,8 @@ import os
 import logging
 from dotenv import load_dotenv
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (niveau réglable par LOG_LEVEL, INFO par défaut)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
 
 # Charger les variables d'environnement selon l'environnement
@@ -19,6 +19,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory, Blueprint, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+import sqlalchemy
+from sqlalchemy.pool import NullPool
 from src.models.user import db
 from src.models.document import Document  # Import du modèle Document
 from src.models.accounting_data import BankTransaction, TVAClient  # Import des modèles comptables
@@ -45,8 +47,8 @@ else:
     try:
         from src.routes.ai_agent import ai_agent_bp
         # Test if AI agent actually works
-        from src.agents.sage_agent import SageAgentManager
-        test_agent = SageAgentManager()
+        from src.agents.sage_agent import get_sage_manager
+        test_agent = get_sage_manager()
         # Test with a simple request - if this fails, AI is not available
         test_response = test_agent.get_agent_capabilities()
         if test_response and len(test_response) > 0:
@@ -474,6 +476,20 @@ sqlite_path = os.path.join(database_dir, 'app.db')
 app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{sqlite_path}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Options du moteur: INSERT groupés pour les imports et seeds en masse
+engine_options = {}
+if int(sqlalchemy.__version__.split('.')[0]) >= 2:
+    engine_options['insertmanyvalues_page_size'] = 10000
+database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+if not database_uri.startswith('sqlite'):
+    engine_options['pool_pre_ping'] = True
+if database_uri.startswith('postgresql+psycopg2'):
+    engine_options['executemany_mode'] = 'values_plus_batch'
+# Scripts ponctuels (init, migrations): pas de pool de connexions
+if os.getenv('SQLALCHEMY_NULL_POOL'):
+    engine_options['poolclass'] = NullPool
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
 if os.getenv('RAILWAY_ENVIRONMENT'):
     logger.info("🗄️ Using SQLite database (Production on Railway)")
 else:
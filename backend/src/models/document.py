@@ -113,13 +113,15 @@ class Document(db.Model):
         """Vérifie si le type de fichier est supporté"""
         supported_types = Document.get_supported_file_types()
         
+        # Extension calculée une fois (rpartition: seul le dernier '.' compte)
+        file_extension = '.' + filename.lower().rpartition('.')[2] if filename and '.' in filename else ''
+        
         for file_type, config in supported_types.items():
             if mime_type in config['mime_types']:
                 return True, file_type
             
             # Vérification par extension si le nom de fichier est fourni
             if filename:
-                file_extension = '.' + filename.lower().split('.')[-1] if '.' in filename else ''
                 if file_extension in config['extensions']:
                     return True, file_type
         
@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
+from src.utils.json_utils import json_dumps
 
 db = SQLAlchemy()
 
@@ -79,7 +80,7 @@ class Conversation(db.Model):
             'metadata': metadata or {}
         }
         messages.append(new_message)
-        self.messages = json.dumps(messages, ensure_ascii=False)
+        self.messages = json_dumps(messages)
         self.updated_at = datetime.utcnow()
     
     def get_messages(self):
@@ -90,7 +91,7 @@ class Conversation(db.Model):
     
     def set_metadata(self, metadata_dict):
         """Set conversation metadata"""
-        self.conversation_metadata = json.dumps(metadata_dict, ensure_ascii=False)
+        self.conversation_metadata = json_dumps(metadata_dict)
     
     def get_metadata(self):
         """Get conversation metadata"""
@@ -129,7 +130,7 @@ class SageOperation(db.Model):
     
     def set_operation_data(self, data_dict):
         """Set operation parameters"""
-        self.operation_data = json.dumps(data_dict, ensure_ascii=False)
+        self.operation_data = json_dumps(data_dict)
     
     def get_operation_data(self):
         """Get operation parameters"""
@@ -139,7 +140,7 @@ class SageOperation(db.Model):
     
     def set_sage_response(self, response_dict):
         """Set Sage API response"""
-        self.sage_response = json.dumps(response_dict, ensure_ascii=False)
+        self.sage_response = json_dumps(response_dict)
         self.completed_at = datetime.utcnow()
     
     def get_sage_response(self):
@@ -182,7 +183,7 @@ class FileAttachment(db.Model):
     
     def set_analysis_metadata(self, metadata_dict):
         """Set file analysis metadata"""
-        self.analysis_metadata = json.dumps(metadata_dict, ensure_ascii=False)
+        self.analysis_metadata = json_dumps(metadata_dict)
     
     def get_analysis_metadata(self):
         """Get file analysis metadata"""
@@ -218,7 +219,7 @@ class AutomationRule(db.Model):
     
     def set_rule_config(self, config_dict):
         """Set rule configuration"""
-        self.rule_config = json.dumps(config_dict, ensure_ascii=False)
+        self.rule_config = json_dumps(config_dict)
     
     def get_rule_config(self):
         """Get rule configuration"""
@@ -251,7 +252,7 @@ class AuditLog(db.Model):
     
     def set_details(self, details_dict):
         """Set action details"""
-        self.details = json.dumps(details_dict, ensure_ascii=False)
+        self.details = json_dumps(details_dict)
     
     def get_details(self):
         """Get action details"""
@@ -284,7 +285,7 @@ class Message(db.Model):
     
     def set_metadata(self, metadata_dict):
         """Set message metadata"""
-        self.message_metadata = json.dumps(metadata_dict, ensure_ascii=False)
+        self.message_metadata = json_dumps(metadata_dict)
     
     def get_metadata(self):
         """Get message metadata"""
@@ -1,21 +1,42 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.user import User, Conversation, Message, AuditLog, db
-from src.agents.sage_agent import SageAgentManager
-from datetime import datetime
+from langchain_core.messages import HumanMessage, SystemMessage
+from src.models.user import User, Conversation, Message, AuditLog, SageOperation, FileAttachment, db
+from src.agents.sage_agent import STREAM_RESULT, get_classifier_llm, get_sage_manager, iter_async, run_async
+from src.tools.sage_tools import SAGE_TOOLS, set_user_credentials
+from src.utils.json_utils import json_dumps
+from datetime import datetime, timedelta
+import json
+import logging
 import os
+import re
+import traceback
+import uuid
 
 ai_agent_bp = Blueprint('ai_agent', __name__)
 
-# Initialiser le gestionnaire d'agent
-agent_manager = SageAgentManager()
+logger = logging.getLogger(__name__)
+
+# Gestionnaire d'agent partagé avec le reste de l'application: obtenu via
+# get_sage_manager() au premier appel, pas à l'enregistrement du blueprint
+
+# Motifs compilés une seule fois (confirmation manuelle, exécution des actions planifiées)
+_MANUAL_CONFIRMATION_RE = re.compile(r'(?:oui|yes)\s+(?:confirmer?|confirm)\s+([a-f0-9]{8})')
+_NAME_RE = re.compile(r'nom\s+([^,]+)', re.IGNORECASE)
+_CLIENT_RE = re.compile(r'client\s+([^,]+)', re.IGNORECASE)
+_EMAIL_RE = re.compile(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+_PHONE_RE = re.compile(r'(\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2}|\d{10})')
+_ADDRESS_RE = re.compile(r'(\d+\s[^,]+),?\s*(\d{5})\s*([^,\n]+)')
+_INVOICE_AMOUNT_RE = re.compile(r'(\d+(?:[.,]\d{2})?)\s*€?')
+_SERVICE_RE = re.compile(r'(service|produit|consultation|formation)\s+([^,\n]+)', re.IGNORECASE)
+_CUSTOMER_ID_RE = re.compile(r'ID:\s*([^,)]+)')
 
 def should_skip_confirmation_intelligent(user_message, planned_action, agent_response):
     """
     Use LLM to intelligently determine if an operation needs confirmation.
     Returns True if the operation is safe (read-only) and doesn't need confirmation.
     """
-    print("=== INTELLIGENT CONFIRMATION ANALYSIS STARTED ===")
+    logger.debug("=== INTELLIGENT CONFIRMATION ANALYSIS STARTED ===")
     
     try:
         # Extract relevant information
@@ -23,17 +44,17 @@ def should_skip_confirmation_intelligent(user_message, planned_action, agent_res
         action_description = planned_action.get('description', '')
         user_intent = user_message
         
-        print(f"User Intent: {user_intent}")
-        print(f"Action Type: {action_type}")
-        print(f"Action Description: {action_description}")
+        logger.debug("User Intent: %s", user_intent)
+        logger.debug("Action Type: %s", action_type)
+        logger.debug("Action Description: %s", action_description)
         
         # Get OpenAI API key
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
-            print("❌ No OpenAI API key found - using fallback")
+            logger.warning("❌ No OpenAI API key found - using fallback")
             return False
         
-        print("✅ OpenAI API key found - proceeding with LLM analysis")
+        logger.debug("✅ OpenAI API key found - proceeding with LLM analysis")
         
         # Simple heuristic analysis first (as backup to LLM)
         user_lower = user_intent.lower()
@@ -64,31 +85,26 @@ def should_skip_confirmation_intelligent(user_message, planned_action, agent_res
         safe_score = sum(1 for indicator in safe_indicators if indicator)
         danger_score = sum(1 for indicator in dangerous_indicators if indicator)
         
-        print(f"Safe indicators found: {safe_score}")
-        print(f"Danger indicators found: {danger_score}")
+        logger.debug("Safe indicators found: %s", safe_score)
+        logger.debug("Danger indicators found: %s", danger_score)
         
         # If clearly safe based on heuristics, skip confirmation
         if safe_score >= 2 and danger_score == 0:
-            print("🟢 HEURISTIC DECISION: SAFE - Skipping confirmation")
+            logger.info("🟢 HEURISTIC DECISION: SAFE - Skipping confirmation")
             return True
             
         # If clearly dangerous, require confirmation  
         if danger_score >= 1:
-            print("🔴 HEURISTIC DECISION: DANGEROUS - Requiring confirmation")
+            logger.info("🔴 HEURISTIC DECISION: DANGEROUS - Requiring confirmation")
             return False
         
         # For ambiguous cases, try LLM analysis
         try:
-            from langchain_openai import ChatOpenAI
-            from langchain_core.messages import HumanMessage, SystemMessage
-            
-            # Initialize LLM with a fast model for classification
-            llm = ChatOpenAI(
-                model="gpt-3.5-turbo",
-                api_key=api_key,
-                temperature=0,  # Deterministic for classification
-                max_tokens=10   # Very short response for classification
-            )
+            
+            # LLM de classification partagé (même pool de connexions que les agents)
+            llm = get_classifier_llm()
+            if llm is None:
+                raise RuntimeError("Classification LLM unavailable")
             
             # Simplified prompt for better reliability
             system_prompt = """Classify accounting operation safety. 
@@ -118,34 +134,34 @@ def should_skip_confirmation_intelligent(user_message, planned_action, agent_res
             response = llm.invoke(messages)
             classification = response.content.strip().upper()
             
-            print(f"🤖 LLM Classification: {classification}")
+            logger.debug("🤖 LLM Classification: %s", classification)
             
             # Return True if operation is SAFE (should skip confirmation)
             if 'SAFE' in classification:
-                print("🟢 LLM DECISION: SAFE - Skipping confirmation")
+                logger.info("🟢 LLM DECISION: SAFE - Skipping confirmation")
                 return True
             else:
-                print("🔴 LLM DECISION: DANGEROUS - Requiring confirmation")
+                logger.info("🔴 LLM DECISION: DANGEROUS - Requiring confirmation")
                 return False
                 
         except Exception as llm_error:
-            print(f"❌ LLM analysis failed: {llm_error}")
+            logger.warning("❌ LLM analysis failed: %s", llm_error)
             
             # Fallback: if heuristics suggest safe, go with it
             if safe_score > danger_score:
-                print("🟡 FALLBACK DECISION: SAFE based on heuristics")
+                logger.info("🟡 FALLBACK DECISION: SAFE based on heuristics")
                 return True
             else:
-                print("🟡 FALLBACK DECISION: CONSERVATIVE - Requiring confirmation")
+                logger.info("🟡 FALLBACK DECISION: CONSERVATIVE - Requiring confirmation")
                 return False
         
     except Exception as e:
-        print(f"❌ Error in intelligent confirmation analysis: {e}")
+        logger.error("❌ Error in intelligent confirmation analysis: %s", e)
         # Ultimate fallback to conservative approach
-        print("🔴 ULTIMATE FALLBACK: Requiring confirmation")
+        logger.warning("🔴 ULTIMATE FALLBACK: Requiring confirmation")
         return False
     finally:
-        print("=== INTELLIGENT CONFIRMATION ANALYSIS COMPLETED ===")  
+        logger.debug("=== INTELLIGENT CONFIRMATION ANALYSIS COMPLETED ===")
 
 @ai_agent_bp.route('/agent/chat', methods=['POST'])
 @jwt_required()
@@ -164,9 +180,9 @@ def chat_with_agent():
         attached_files = data.get('attached_files', [])  # Liste des IDs de fichiers attachés
         
         # Debug logging pour les fichiers attachés
-        print(f"🔍 DEBUG: Request data received: {data}")
-        print(f"🔍 DEBUG: Attached files IDs: {attached_files}")
-        print(f"🔍 DEBUG: Attached files count: {len(attached_files) if attached_files else 0}")
+        logger.debug("Request data received: %s", data)
+        logger.debug("Attached files IDs: %s", attached_files)
+        logger.debug("Attached files count: %s", len(attached_files) if attached_files else 0)
         
         # Récupérer l'utilisateur et ses credentials Sage
         user = User.query.get(user_id)
@@ -199,11 +215,10 @@ def chat_with_agent():
             db.session.flush()  # Pour obtenir l'ID
         
         # Préparer les métadonnées du message (incluant les fichiers attachés)
-        import json
         message_metadata = {}
         if attached_files:
             message_metadata['attached_files'] = attached_files
-            print(f"💾 DEBUG: Storing attached files in message metadata: {attached_files}")
+            logger.debug("Storing attached files in message metadata: %s", attached_files)
         
         # Sauvegarder le message utilisateur avec métadonnées
         user_msg = Message(
@@ -215,54 +230,22 @@ def chat_with_agent():
         db.session.add(user_msg)
         
         # Check if this is a confirmation response (via confirmation_id OR manual typing)
-        confirmation_id = data.get('confirmation_id')
-        
-        # Also check if the user manually typed a confirmation with an ID
-        manual_confirmation_match = None
-        if not confirmation_id:
-            import re
-            # Check for manual confirmation pattern: "OUI CONFIRMER [8-char-id]"
-            match = re.search(r'(?:oui|yes)\s+(?:confirmer?|confirm)\s+([a-f0-9]{8})', user_message.lower())
-            if match:
-                manual_confirmation_match = match.group(1)
-                # Find the operation with this partial ID
-                from src.models.user import SageOperation
-                operation = SageOperation.query.filter_by(user_id=user_id).filter(
-                    SageOperation.operation_data.contains(manual_confirmation_match)
-                ).filter_by(status='awaiting_confirmation').first()
-                if operation:
-                    confirmation_id = operation.get_operation_data().get('confirmation_id')
-        
+        confirmation_id = find_confirmation_id(user_id, data, user_message)
         if confirmation_id:
             return handle_agent_confirmation(user_id, confirmation_id, user_message, conversation, user_msg)
         
-        # Also check if this is a manual "NON" for rejection
-        elif user_message.lower().strip() == 'non':
-            # Find any pending confirmation for this user
-            from src.models.user import SageOperation
-            pending_operation = SageOperation.query.filter_by(
-                user_id=user_id, 
-                status='awaiting_confirmation'
-            ).first()
-            if pending_operation:
-                operation_data = pending_operation.get_operation_data()
-                confirmation_id = operation_data.get('confirmation_id')
-                if confirmation_id:
-                    return handle_agent_confirmation(user_id, confirmation_id, user_message, conversation, user_msg)
-        
         # Préparer le contexte des fichiers attachés (avec fallback sur fichiers précédents)
         file_context = ""
         final_attached_files = attached_files.copy() if attached_files else []
         
         # Si aucun fichier attaché dans la requête actuelle, chercher dans les messages précédents
         if not final_attached_files and conversation:
-            print("🔍 DEBUG: No new files attached, searching previous messages...")
+            logger.debug("No new files attached, searching previous messages...")
             recent_messages = Message.query.filter_by(
                 conversation_id=conversation.id,
                 is_from_user=True  # Seulement les messages utilisateur
             ).order_by(Message.created_at.desc()).limit(10).all()
             
-            import json
             for msg in recent_messages:
                 if msg.message_metadata:
                     try:
@@ -270,25 +253,26 @@ def chat_with_agent():
                         prev_files = metadata.get('attached_files', [])
                         if prev_files:
                             final_attached_files = prev_files
-                            print(f"🔄 DEBUG: Found attached files from previous message: {prev_files}")
+                            logger.debug("Found attached files from previous message: %s", prev_files)
                             break
                     except json.JSONDecodeError:
                         continue
         
         if final_attached_files:
-            print(f"📎 DEBUG: Processing {len(final_attached_files)} attached files (new: {len(attached_files)}, from history: {len(final_attached_files) - len(attached_files)})")
-            from src.models.user import FileAttachment
+            logger.debug("Processing %s attached files (new: %s, from history: %s)",
+                         len(final_attached_files), len(attached_files),
+                         len(final_attached_files) - len(attached_files))
             file_context = "\n\n📎 FICHIERS ANALYSÉS:\n"
             
             for file_id in final_attached_files:
-                print(f"📎 DEBUG: Processing file ID: {file_id}")
+                logger.debug("Processing file ID: %s", file_id)
                 file_attachment = FileAttachment.query.filter_by(
                     id=file_id, 
                     user_id=user_id
                 ).first()
                 
                 if file_attachment:
-                    print(f"✅ DEBUG: File found: {file_attachment.original_filename}")
+                    logger.debug("File found: %s", file_attachment.original_filename)
                     metadata = file_attachment.get_analysis_metadata()
                     file_context += f"- {file_attachment.original_filename} (✓ Analysé avec succès)\n"
                     
@@ -296,17 +280,17 @@ def chat_with_agent():
                         file_context += f"  💰 Document financier détecté\n"
                     
                     if file_attachment.processed_content:
-                        print(f"📄 DEBUG: File has processed content: {len(file_attachment.processed_content)} chars")
+                        logger.debug("File has processed content: %s chars", len(file_attachment.processed_content))
                     else:
-                        print(f"⚠️ DEBUG: File has NO processed content")
+                        logger.debug("File has NO processed content")
                     
                     # Log full metadata for debugging
-                    print(f"📊 DEBUG: File metadata: {metadata}")
+                    logger.debug("File metadata: %s", metadata)
                     
                 else:
-                    print(f"❌ DEBUG: File ID {file_id} not found for user {user_id}")
+                    logger.warning("File ID %s not found for user %s", file_id, user_id)
         else:
-            print("📎 DEBUG: No attached files found (current or previous messages)")
+            logger.debug("No attached files found (current or previous messages)")
         
         # Ajouter les conseils seulement s'il y a des fichiers
         if file_context:
@@ -319,30 +303,18 @@ def chat_with_agent():
             file_context += f"• Utilisez document_analysis pour analyser le contenu général\n\n"
         
         # Récupérer l'historique de conversation pour le contexte
-        conversation_context = []
-        if conversation:
-            # Récupérer les derniers messages de la conversation pour le contexte
-            recent_messages = Message.query.filter_by(
-                conversation_id=conversation.id
-            ).order_by(Message.created_at.desc()).limit(10).all()
-            
-            # Construire le contexte de conversation (ordre chronologique)
-            for msg in reversed(recent_messages[1:]):  # Exclure le message actuel
-                role = "user" if msg.is_from_user else "assistant"
-                conversation_context.append({
-                    "role": role,
-                    "content": msg.content,
-                    "timestamp": msg.created_at.isoformat()
-                })
+        conversation_context = get_conversation_context(conversation)
         
         # Traiter le message avec l'agent AI (inclure le contexte des fichiers)
         enhanced_message = user_message
         if file_context:
             enhanced_message = user_message + file_context
         
-        agent_response = agent_manager.process_user_request(
-            enhanced_message, user_id, conversation_context
-        )
+        # Chemin asynchrone: les outils demandés dans un même tour s'exécutent en parallèle
+        # Credentials déjà lus ci-dessus: l'agent ne les relit pas
+        agent_response = run_async(get_sage_manager().aprocess_user_request(
+            enhanced_message, user_id, conversation_context, sage_credentials=credentials
+        ))
         
         # Normaliser la réponse de l'agent (peut être string ou dict)
         if isinstance(agent_response, str):
@@ -367,7 +339,7 @@ def chat_with_agent():
             # Use intelligent LLM-based analysis to determine if confirmation is needed
             if should_skip_confirmation_intelligent(user_message, planned_action, agent_response):
                 # Log that we're bypassing confirmation based on intelligent analysis
-                print(f"Intelligent bypass: Operation '{planned_action.get('type')}' identified as safe read-only operation")
+                logger.info("Intelligent bypass: Operation '%s' identified as safe read-only operation", planned_action.get('type'))
                 # Continue with normal response flow without confirmation
             else:
                 return request_agent_confirmation(user_id, agent_response, conversation, user_msg)
@@ -420,14 +392,178 @@ def chat_with_agent():
         db.session.rollback()
         return jsonify({'error': f'Erreur lors du traitement: {str(e)}'}), 500
 
+def find_confirmation_id(user_id, data, user_message):
+    """
+    Identifiant de l'opération à laquelle répond le message (confirmation_id
+    envoyé, « OUI CONFIRMER xxxxxxxx » tapé, ou « NON » avec une opération
+    en attente), ou None pour un message ordinaire
+    """
+    confirmation_id = data.get('confirmation_id')
+    if confirmation_id:
+        return confirmation_id
+    
+    # Check for manual confirmation pattern: "OUI CONFIRMER [8-char-id]"
+    match = _MANUAL_CONFIRMATION_RE.search(user_message.lower())
+    if match:
+        # Find the operation with this partial ID
+        operation = SageOperation.query.filter_by(user_id=user_id).filter(
+            SageOperation.operation_data.contains(match.group(1))
+        ).filter_by(status='awaiting_confirmation').first()
+        if operation:
+            return operation.get_operation_data().get('confirmation_id')
+    
+    # Also check if this is a manual "NON" for rejection
+    elif user_message.lower().strip() == 'non':
+        # Find any pending confirmation for this user
+        pending_operation = SageOperation.query.filter_by(
+            user_id=user_id, 
+            status='awaiting_confirmation'
+        ).first()
+        if pending_operation:
+            return pending_operation.get_operation_data().get('confirmation_id')
+    
+    return None
+
+def get_conversation_context(conversation):
+    """Derniers messages de la conversation (ordre chronologique, sans le message courant)"""
+    conversation_context = []
+    if conversation:
+        # Récupérer les derniers messages de la conversation pour le contexte
+        recent_messages = Message.query.filter_by(
+            conversation_id=conversation.id
+        ).order_by(Message.created_at.desc()).limit(10).all()
+        
+        # Construire le contexte de conversation (ordre chronologique)
+        for msg in reversed(recent_messages[1:]):  # Exclure le message actuel
+            role = "user" if msg.is_from_user else "assistant"
+            conversation_context.append({
+                "role": role,
+                "content": msg.content,
+                "timestamp": msg.created_at.isoformat()
+            })
+    return conversation_context
+
+def format_sse(data: dict, event: str = None) -> str:
+    """Formate un événement Server-Sent Events"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json_dumps(data)}\n\n"
+
+@ai_agent_bp.route('/agent/chat/stream', methods=['POST'])
+@jwt_required()
+def chat_with_agent_stream():
+    """
+    Variante de /agent/chat en flux (Server-Sent Events): les fragments de la
+    réponse sont envoyés dès leur génération
+    
+    Événements "data: {delta}" puis un événement final: "done", ou
+    "confirmation" (même contenu que la réponse de /agent/chat) si l'agent a
+    planifié une action à confirmer; le texte affiché est alors remplacé par
+    la demande de confirmation. Les réponses de confirmation (OUI CONFIRMER /
+    NON) reçoivent une réponse JSON, sans flux. Les fichiers joints restent
+    gérés par /agent/chat.
+    """
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.json
+        
+        if not data or not data.get('message'):
+            return jsonify({'error': 'Message requis'}), 400
+        
+        user_message = data.get('message')
+        conversation_id = data.get('conversation_id')
+        
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({'error': 'Utilisateur non trouvé'}), 404
+        
+        credentials = user.get_sage_credentials()
+        if not credentials:
+            return jsonify({
+                'error': 'Credentials Sage non configurés',
+                'suggestion': 'Veuillez d\'abord vous connecter à Sage Business Cloud Accounting'
+            }), 400
+        
+        if conversation_id:
+            conversation = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+            if not conversation:
+                return jsonify({'error': 'Conversation non trouvée'}), 404
+        else:
+            conversation = Conversation(
+                user_id=user_id,
+                title=user_message[:50] + "..." if len(user_message) > 50 else user_message,
+                messages='[]'
+            )
+            db.session.add(conversation)
+            db.session.flush()
+        
+        user_msg = Message(conversation_id=conversation.id, content=user_message, is_from_user=True)
+        db.session.add(user_msg)
+        
+        # Réponse à une demande de confirmation: traitée comme sur /agent/chat
+        confirmation_id = find_confirmation_id(user_id, data, user_message)
+        if confirmation_id:
+            return handle_agent_confirmation(user_id, confirmation_id, user_message, conversation, user_msg)
+        
+        conversation_context = get_conversation_context(conversation)
+        db.session.commit()
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erreur lors du traitement: {str(e)}'}), 500
+    
+    def generate():
+        result_str = ''
+        for kind, text in iter_async(get_sage_manager().astream_user_request(
+            user_message, user_id, conversation_context, sage_credentials=credentials
+        )):
+            if kind == STREAM_RESULT:
+                # Réponse finale de l'agent (sans le texte des tours intermédiaires)
+                result_str = text
+            else:
+                yield format_sse({'delta': text})
+        
+        agent_response = get_sage_manager().parse_planned_action(result_str)
+        
+        # Action planifiée: même confirmation que sur /agent/chat
+        planned_action = agent_response.get('planned_action')
+        if planned_action and not should_skip_confirmation_intelligent(user_message, planned_action, agent_response):
+            confirmation, _status = request_agent_confirmation(user_id, agent_response, conversation, user_msg)
+            yield format_sse(confirmation.get_json(), event='confirmation')
+            return
+        
+        agent_msg = Message(
+            conversation_id=conversation.id,
+            content=agent_response['response'],
+            is_from_user=False
+        )
+        agent_msg.set_metadata({
+            'agent_type': agent_response.get('agent_type'),
+            'capabilities_used': agent_response.get('capabilities_used', []),
+            'success': agent_response.get('success', False),
+            'streamed': True
+        })
+        db.session.add(agent_msg)
+        db.session.commit()
+        
+        yield format_sse({
+            'conversation_id': conversation.id,
+            'message_id': agent_msg.id,
+            'planned_action': agent_response.get('planned_action'),
+            'timestamp': agent_msg.created_at.isoformat()
+        }, event='done')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @ai_agent_bp.route('/agent/capabilities', methods=['GET'])
 @jwt_required()
 def get_agent_capabilities():
     """Récupère les capacités disponibles de l'agent AI"""
     try:
-        capabilities = agent_manager.get_agent_capabilities()
+        # Corps JSON sérialisé une seule fois par le gestionnaire
+        capabilities_json = get_sage_manager().get_agent_capabilities_json()
         
-        return jsonify(capabilities), 200
+        return Response(capabilities_json, status=200, mimetype='application/json')
         
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la récupération des capacités: {str(e)}'}), 500
@@ -452,7 +588,7 @@ def get_suggestions():
             data = request.get_json(force=True) or {}
         except Exception as json_error:
             # If not JSON, treat as empty data (POST request without JSON body)
-            print(f"Warning: No JSON data in suggestions request: {json_error}")
+            logger.warning("No JSON data in suggestions request: %s", json_error)
             data = {}
         
         # Récupérer l'utilisateur avec error handling
@@ -471,7 +607,7 @@ def get_suggestions():
             sage_connected = bool(credentials)
         except Exception as cred_error:
             # Log but don't fail - just assume not connected
-            print(f"Warning: Could not check Sage credentials for user {user_id}: {cred_error}")
+            logger.warning("Could not check Sage credentials for user %s: %s", user_id, cred_error)
             sage_connected = False
         
         # Générer des suggestions basées sur le contexte
@@ -502,7 +638,7 @@ def get_suggestions():
                 .order_by(Conversation.created_at.desc()).limit(3).all()
         except Exception as conv_error:
             # Log but don't fail - just don't show conversation suggestions
-            print(f"Warning: Could not load recent conversations for user {user_id}: {conv_error}")
+            logger.warning("Could not load recent conversations for user %s: %s", user_id, conv_error)
         
         if recent_conversations:
             suggestions.append("Continuer notre dernière conversation")
@@ -518,9 +654,8 @@ def get_suggestions():
         
     except Exception as e:
         # More detailed error logging
-        import traceback
         error_details = traceback.format_exc()
-        print(f"Error in get_suggestions: {error_details}")
+        logger.error("Error in get_suggestions: %s", error_details)
         return jsonify({'error': f'Erreur lors de la génération des suggestions: {str(e)}'}), 500
 
 @ai_agent_bp.route('/agent/quick-actions', methods=['GET'])
@@ -641,9 +776,6 @@ def execute_quick_action():
 
 def request_agent_confirmation(user_id, agent_response, conversation, user_msg):
     """Demande confirmation après analyse de l'agent"""
-    from src.models.user import SageOperation, db
-    import uuid
-    from datetime import datetime
     
     # Créer une opération en attente de confirmation avec le plan détaillé
     operation = SageOperation(
@@ -691,8 +823,6 @@ def request_agent_confirmation(user_id, agent_response, conversation, user_msg):
 
 def handle_agent_confirmation(user_id, confirmation_id, user_message, conversation, user_msg):
     """Traite la confirmation après analyse de l'agent"""
-    from src.models.user import SageOperation, db
-    from datetime import datetime
     
     # Trouver l'opération en attente (inclure tous les statuts pour éviter les doublons)
     operation = SageOperation.query.filter_by(
@@ -735,7 +865,7 @@ def handle_agent_confirmation(user_id, confirmation_id, user_message, conversati
             return execute_planned_action(operation, conversation)
         except Exception as e:
             db.session.rollback()
-            print(f"Error during confirmation: {e}")
+            logger.error("Error during confirmation: %s", e)
             response = "❌ Erreur lors de la confirmation. Veuillez réessayer."
             return create_agent_response(response, conversation, False)
     elif user_message.lower().strip() == 'non':
@@ -748,7 +878,7 @@ def handle_agent_confirmation(user_id, confirmation_id, user_message, conversati
             return create_agent_response(response, conversation, True)
         except Exception as e:
             db.session.rollback()
-            print(f"Error during rejection: {e}")
+            logger.error("Error during rejection: %s", e)
             response = "❌ Erreur lors de l'annulation. Veuillez réessayer."
             return create_agent_response(response, conversation, False)
     else:
@@ -812,7 +942,6 @@ def execute_planned_action(operation, conversation):
 
 def create_agent_response(response_text, conversation, success=True):
     """Helper pour créer une réponse d'agent standardisée"""
-    from datetime import datetime
     
     return jsonify({
         'conversation_id': conversation.id,
@@ -825,11 +954,14 @@ def create_agent_response(response_text, conversation, success=True):
     }), 200
 
 
+def sage_tool_outcome(result):
+    """(succès, message) d'un résultat d'outil Sage: les erreurs commencent par « ❌ »"""
+    return not str(result).lstrip().startswith('❌'), result
+
+
 def execute_real_sage_action(user_id, action_type, planned_action):
     """Exécute réellement l'action dans Sage en utilisant les outils appropriés"""
     try:
-        from src.models.user import User
-        from src.tools.sage_tools import SAGE_TOOLS
         
         # Récupérer l'utilisateur et ses credentials Sage
         user = User.query.get(user_id)
@@ -840,6 +972,10 @@ def execute_real_sage_action(user_id, action_type, planned_action):
         if not credentials:
             return False, "Credentials Sage non configurés"
         
+        # Les outils lisent les credentials du contexte courant (ContextVar):
+        # ici le thread de la requête Flask, hors de la tâche de l'agent
+        set_user_credentials(credentials)
+        
         # Détails de l'action planifiée
         action_details = planned_action.get('details', {})
         
@@ -883,30 +1019,29 @@ def execute_real_sage_action(user_id, action_type, planned_action):
             postal_code = None
             
             # Patterns de recherche dans la description
-            import re
             
             # Nom (chercher après "nom" ou avant une adresse)
-            name_match = re.search(r'nom\s+([^,]+)', description, re.IGNORECASE)
+            name_match = _NAME_RE.search(description)
             if name_match:
                 name = name_match.group(1).strip()
             else:
                 # Fallback: premier mot après "client"
-                client_match = re.search(r'client\s+([^,]+)', description, re.IGNORECASE)
+                client_match = _CLIENT_RE.search(description)
                 if client_match:
                     name = client_match.group(1).strip()
             
             # Email
-            email_match = re.search(r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', description)
+            email_match = _EMAIL_RE.search(description)
             if email_match:
                 email = email_match.group(1)
             
             # Téléphone
-            phone_match = re.search(r'(\d{2}\s\d{2}\s\d{2}\s\d{2}\s\d{2}|\d{10})', description)
+            phone_match = _PHONE_RE.search(description)
             if phone_match:
                 phone = phone_match.group(1)
             
             # Adresse et code postal
-            address_match = re.search(r'(\d+\s[^,]+),?\s*(\d{5})\s*([^,\n]+)', description)
+            address_match = _ADDRESS_RE.search(description)
             if address_match:
                 address_line_1 = address_match.group(1).strip()
                 postal_code = address_match.group(2)
@@ -928,7 +1063,7 @@ def execute_real_sage_action(user_id, action_type, planned_action):
                 postal_code=postal_code
             )
             
-            return True, result
+            return sage_tool_outcome(result)
         
         elif action_type == 'create_invoice':
             # Pour les factures, créer une facture avec des éléments basiques
@@ -936,14 +1071,13 @@ def execute_real_sage_action(user_id, action_type, planned_action):
             description = planned_action.get('description', '')
             
             # Parser les informations de facture depuis la description
-            import re
             
             # Chercher un montant dans la description
-            amount_match = re.search(r'(\d+(?:[.,]\d{2})?)\s*€?', description)
+            amount_match = _INVOICE_AMOUNT_RE.search(description)
             amount = float(amount_match.group(1).replace(',', '.')) if amount_match else 100.0
             
             # Chercher un nom de client/produit
-            service_match = re.search(r'(service|produit|consultation|formation)\s+([^,\n]+)', description, re.IGNORECASE)
+            service_match = _SERVICE_RE.search(description)
             service_name = service_match.group(2).strip() if service_match else "Service de consultation"
             
             # Éléments de facture par défaut
@@ -956,13 +1090,11 @@ def execute_real_sage_action(user_id, action_type, planned_action):
             ]
             
             # Date actuelle
-            from datetime import datetime, timedelta
             today = datetime.now().strftime("%Y-%m-%d")
             due_date = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
             
             # First, try to get the first available customer
             try:
-                from src.tools.sage_tools import SAGE_TOOLS
                 get_customers_tool = None
                 for tool in SAGE_TOOLS:
                     if getattr(tool, 'name', '') == 'get_customers':
@@ -972,8 +1104,7 @@ def execute_real_sage_action(user_id, action_type, planned_action):
                 if get_customers_tool:
                     customers_result = get_customers_tool._run(limit=1)
                     # Extract customer ID from the result (format: "ID: customer_id")
-                    import re
-                    customer_match = re.search(r'ID:\s*([^,)]+)', customers_result)
+                    customer_match = _CUSTOMER_ID_RE.search(customers_result)
                     if customer_match:
                         customer_id = customer_match.group(1).strip()
                     else:
@@ -990,17 +1121,17 @@ def execute_real_sage_action(user_id, action_type, planned_action):
                 due_date=due_date,
                 reference=f"FACT-{datetime.now().strftime('%Y%m%d-%H%M')}"
             )
-            return True, result
+            return sage_tool_outcome(result)
         
         elif action_type in ['get_customers', 'get_invoices', 'get_products']:
             # Actions de consultation
             result = sage_tool._run()
-            return True, result
+            return sage_tool_outcome(result)
         
         else:
             return False, f"Exécution pour le type '{action_type}' pas encore implémentée"
     
     except Exception as e:
-        print(f"Error executing real Sage action: {e}")
+        logger.error("Error executing real Sage action: %s", e)
         return False, f"Erreur lors de l'exécution: {str(e)}"
 
@@ -7,8 +7,8 @@ agent_manager = None
 AI_COMPONENTS_AVAILABLE = False
 
 try:
-    from src.agents.sage_agent import SageAgentManager
-    agent_manager = SageAgentManager()
+    from src.agents.sage_agent import get_sage_manager
+    agent_manager = get_sage_manager()
     AI_COMPONENTS_AVAILABLE = True
 except ImportError as e:
     print(f"AI components not available in test routes: {e}")
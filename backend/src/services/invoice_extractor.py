@@ -175,14 +175,14 @@ class InvoiceExtractor:
             full_client_text = '\n'.join(client_sections)
             
             # Extraire le nom (première ligne non vide)
-            first_line = client_sections[0].split('\n')[0].strip()
+            first_line = client_sections[0].partition('\n')[0].strip()
             if first_line and len(first_line) > 2:
                 client_info['client_name'] = first_line
             
             # Extraire l'adresse (lignes suivantes)
             address_lines = []
             for section in client_sections:
-                lines = section.split('\n')[1:]  # Ignorer la première ligne (nom)
+                lines = section.partition('\n')[2].split('\n')  # Ignorer la première ligne (nom)
                 address_lines.extend([line.strip() for line in lines if line.strip()])
             
             if address_lines:
@@ -17,6 +17,7 @@ from typing import Type, Dict, Any, Optional, List
 from pydantic import BaseModel, Field
 from src.services.sage_auth import SageOAuth2Service
 from src.services.sage_api import SageAPIService
+import contextvars
 import json
 import os
 import time
@@ -30,18 +31,18 @@ SAGE_REDIRECT_URI = os.getenv('SAGE_REDIRECT_URI', 'http://localhost:5000/api/sa
 sage_oauth = SageOAuth2Service(SAGE_CLIENT_ID, SAGE_CLIENT_SECRET, SAGE_REDIRECT_URI)
 sage_api = SageAPIService(sage_oauth)
 
-# Variable globale pour stocker les credentials de l'utilisateur courant
-_current_user_credentials = None
+# Credentials de l'utilisateur courant, propres à chaque requête: un thread ou
+# une tâche asyncio ne voit que les siens (les tâches filles et les outils
+# exécutés via run_in_executor héritent d'une copie du contexte)
+_current_user_credentials: contextvars.ContextVar = contextvars.ContextVar('sage_user_credentials', default=None)
 
 def set_user_credentials(credentials: Dict[str, Any]):
-    """Définit les credentials de l'utilisateur courant pour tous les outils Sage"""
-    global _current_user_credentials
-    _current_user_credentials = credentials
+    """Définit les credentials de l'utilisateur courant pour tous les outils Sage (requête en cours)"""
+    _current_user_credentials.set(credentials)
 
 def get_user_credentials() -> Optional[Dict[str, Any]]:
     """Récupère les credentials de l'utilisateur courant"""
-    global _current_user_credentials
-    return _current_user_credentials
+    return _current_user_credentials.get()
 
 class SageBaseTool(BaseTool):
     """Classe de base pour tous les outils Sage avec injection automatique des credentials"""
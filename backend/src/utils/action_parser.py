@@ -0,0 +1,234 @@
+"""
+Analyse des réponses d'agent: action planifiée (marqueur PLANNED_ACTION) et
+détails mentionnés (client, montant, produit, prix)
+
+Module autonome (re/re2 et la bibliothèque standard seulement), entièrement
+annoté: compilable tel quel avec mypyc (`mypyc src/utils/action_parser.py`).
+Sans module compilé, c'est cette version Python qui est importée.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+# re2 (google-re2): temps linéaire garanti pour les motifs appliqués aux réponses du LLM
+try:
+    import re2  # type: ignore
+    RE2_AVAILABLE = True
+except ImportError:
+    re2 = None
+    RE2_AVAILABLE = False
+
+
+class PlannedAction(NamedTuple):
+    """Action planifiée extraite d'une réponse d'agent (immuable: peut être mise en cache)"""
+    response: str  # réponse principale, avant le marqueur
+    action_type: str
+    description: str
+    details: Tuple[Tuple[str, str], ...]  # paires (clé, valeur)
+
+
+_PLANNED_ACTION_RE = re.compile(r'PLANNED_ACTION:\s*\[type:(.*?)\]\s*\[description:(.*?)\]')
+
+# \s et \d de re couvrent tout Unicode, ceux de re2 seulement l'ASCII: classes
+# élargies pour re2, afin de garder les mêmes correspondances (espaces
+# insécables de « 1 200,50 € » notamment). Les motifs sont appliqués au texte
+# en minuscules: les lettres sont celles que [A-Za-z] acceptait sans tenir
+# compte de la casse (« ı » et « ſ » n'ont pas de minuscule ASCII). Entre
+# deux mots, les espaces sauf le saut de ligne
+_RE_WHITESPACE, _RE_DIGIT, _RE_LETTER = r'\s', r'\d', 'a-z\u0131\u017f'
+_RE2_WHITESPACE, _RE2_DIGIT, _RE2_LETTER = r'\x{09}-\x{0d}\x{1c}-\x{20}\x{85}\p{Z}', r'\p{Nd}', r'a-z\x{17f}'
+_RE_WORD_SEPARATOR = r'[^\S\n]'
+_RE2_WORD_SEPARATOR = r'[\x{09}\x{0b}-\x{0d}\x{1c}-\x{20}\x{85}\p{Z}]'
+
+# Noms capturés: au plus une ligne de DETAIL_LINE_MAX_CHARS caractères, ou
+# DETAIL_MAX_WORDS mots après « pour » (sans déborder sur les lignes suivantes)
+DETAIL_LINE_MAX_CHARS = 80
+DETAIL_MAX_WORDS = 4
+
+
+def _compile_detail_pattern(pattern: str):
+    """
+    Compile un motif de détail, avec re2 si disponible
+
+    Le motif est en minuscules et s'applique au texte en minuscules (voir
+    _lower_same_length): sans IGNORECASE, le moteur cherche directement le
+    préfixe littéral au lieu de comparer chaque position sans casse.
+
+    Dans pattern, {ws} et {d} désignent les espaces et les chiffres, à placer
+    dans une classe de caractères ([{ws}], [:{ws}]...); {line} est le reste
+    de la ligne (borné) et {words} une suite bornée de mots.
+    """
+    if RE2_AVAILABLE:
+        ws, digit, letter, separator = _RE2_WHITESPACE, _RE2_DIGIT, _RE2_LETTER, _RE2_WORD_SEPARATOR
+    else:
+        ws, digit, letter, separator = _RE_WHITESPACE, _RE_DIGIT, _RE_LETTER, _RE_WORD_SEPARATOR
+    expanded = pattern.format(
+        ws=ws,
+        d=digit,
+        line=r'[^\n]{1,%d}' % DETAIL_LINE_MAX_CHARS,
+        words=r'[%s]+(?:%s+[%s]+){0,%d}' % (letter, separator, letter, DETAIL_MAX_WORDS - 1),
+    )
+    if RE2_AVAILABLE:
+        return re2.compile(expanded)
+    return re.compile(expanded)
+
+
+# Chaque motif de détail est associé à un mot-clé (en minuscules) qu'il contient
+# forcément: s'il est absent du texte, le motif n'est pas évalué. Les mots-clés
+# sont testés un à un avec `in`, seulement quand la branche en a besoin: un
+# automate (KeywordMatcher) remonte chaque occurrence en Python et est plus
+# lent sur les réponses où « client » ou « pour » reviennent souvent
+def _keyword_patterns(*pairs: Tuple[str, str]) -> tuple:
+    return tuple((keyword, _compile_detail_pattern(pattern)) for keyword, pattern in pairs)
+
+
+_CLIENT_NAME_PATTERNS = _keyword_patterns(
+    ('client', r'client[:{ws}]*({line})'),
+    ('nom', r'nom[:{ws}]*({line})'),
+    ('pour', r'pour[{ws}]+({words})'),
+)
+_INVOICE_CLIENT_PATTERNS = _keyword_patterns(
+    ('pour', r'pour[{ws}]+({words})'),
+    ('client', r'client[:{ws}]*({line})'),
+)
+_PRODUCT_NAME_PATTERNS = _keyword_patterns(
+    ('produit', r'produit[:{ws}]*({line})'),
+    ('nom', r'nom[:{ws}]*({line})'),
+)
+_AMOUNT_RE = _compile_detail_pattern(r'([{d}]+(?:,[{d}]+)?(?:\.[{d}]+)?)[{ws}]*€')
+_PRICE_RE = _compile_detail_pattern(r'prix[:{ws}]*([{d}]+(?:,[{d}]+)?(?:\.[{d}]+)?)[{ws}]*€')
+
+
+def _lower_same_length(text: str) -> str:
+    """Texte en minuscules caractère par caractère: mêmes positions que text"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    # Rare: minuscule de plusieurs caractères (« İ » -> « i̇ »); on garde la
+    # première, celle que re.IGNORECASE compare
+    return ''.join(char.lower()[0] for char in text)
+
+
+def _first_capture(patterns: tuple, text: str, text_lower: str) -> Optional[str]:
+    """
+    Groupe capturé par le premier motif qui correspond (sans espaces autour), ou None
+
+    La recherche porte sur text_lower; la valeur est lue dans text, à la même position.
+    """
+    for keyword, pattern in patterns:
+        if keyword in text_lower:
+            match = pattern.search(text_lower)
+            if match:
+                return text[match.start(1):match.end(1)].strip()
+    return None
+
+
+def _extract_client_details(response: str, response_lower: str) -> Dict[str, str]:
+    details: Dict[str, str] = {}
+    if 'nom' in response_lower or 'client' in response_lower:
+        # Try to extract client name
+        client_name = _first_capture(_CLIENT_NAME_PATTERNS, response, response_lower)
+        if client_name is not None:
+            details['client_name'] = client_name
+    return details
+
+
+def _extract_invoice_details(response: str, response_lower: str) -> Dict[str, str]:
+    details: Dict[str, str] = {}
+    # Extract amounts
+    amount_match = _AMOUNT_RE.search(response) if '€' in response else None
+    if amount_match:
+        details['amount'] = amount_match.group(1)
+
+    # Extract client for invoice
+    client_name = _first_capture(_INVOICE_CLIENT_PATTERNS, response, response_lower)
+    if client_name is not None:
+        details['client_name'] = client_name
+    return details
+
+
+def _extract_product_details(response: str, response_lower: str) -> Dict[str, str]:
+    details: Dict[str, str] = {}
+    # Extract product name
+    product_name = _first_capture(_PRODUCT_NAME_PATTERNS, response, response_lower)
+    if product_name is not None:
+        details['product_name'] = product_name
+
+    # Extract price
+    # (les chiffres sont identiques dans response_lower)
+    price_match = _PRICE_RE.search(response_lower) if 'prix' in response_lower else None
+    if price_match:
+        details['price'] = price_match.group(1)
+    return details
+
+
+DetailHandler = Callable[[str, str], Dict[str, str]]
+
+# Extracteur selon le type d'action: le premier mot-clé contenu dans le type l'emporte
+DETAIL_HANDLERS: Tuple[Tuple[str, DetailHandler], ...] = (
+    ('client', _extract_client_details),
+    ('invoice', _extract_invoice_details),
+    ('facture', _extract_invoice_details),
+    ('product', _extract_product_details),
+    ('produit', _extract_product_details),
+)
+
+
+@lru_cache(maxsize=256)
+def _detail_handler(action_type: str) -> Optional[DetailHandler]:
+    """Extracteur de détails du type d'action (résolu une fois par type), ou None"""
+    for keyword, handler in DETAIL_HANDLERS:
+        if keyword in action_type:
+            return handler
+    return None
+
+
+def extract_action_details(response: str, action_type: str) -> Dict[str, str]:
+    """Détails (client, montant, produit, prix) mentionnés dans la réponse, selon le type d'action"""
+    handler = _detail_handler(action_type)
+    if handler is None:
+        # Types d'action sans détail à extraire: ni copie du texte ni recherche
+        return {}
+
+    # Une seule copie en minuscules: les motifs dont le mot-clé en est
+    # absent ne sont pas évalués (un `in` coûte bien moins qu'une recherche qui
+    # échoue)
+    if RE2_AVAILABLE:
+        # re2 travaille sur de l'UTF-8: les demi-codets isolés (JSON malformé) sont remplacés
+        response = response.encode('utf-8', 'replace').decode('utf-8')
+    return handler(response, _lower_same_length(response))
+
+
+def parse_planned_action(result_str: str) -> Optional[PlannedAction]:
+    """Action planifiée de la réponse, ou None sans marqueur PLANNED_ACTION valide"""
+    # Find the PLANNED_ACTION marker: sans marqueur, l'expression régulière n'est
+    # pas évaluée; avec, elle ne parcourt le texte qu'à partir du marqueur
+    marker_pos = result_str.find('PLANNED_ACTION:')
+    action_match = _PLANNED_ACTION_RE.search(result_str, marker_pos) if marker_pos >= 0 else None
+    if not action_match:
+        return None
+
+    action_type = action_match.group(1).strip()
+    action_description = action_match.group(2).strip()
+
+    # Extract the main response (everything before PLANNED_ACTION): simple
+    # tranche jusqu'au marqueur déjà localisé, sans second parcours du texte
+    main_response = result_str[:marker_pos].strip()
+
+    details = extract_action_details(main_response, action_type)
+    return PlannedAction(main_response, action_type, action_description, tuple(details.items()))
+
+
+# Analyses des dernières réponses à action planifiée; les réponses plus longues
+# que PLANNED_ACTION_CACHE_MAX_CHARS sont analysées sans être gardées en mémoire
+PLANNED_ACTION_CACHE_MAX_ENTRIES = 256
+PLANNED_ACTION_CACHE_MAX_CHARS = 8192
+_cached_parse_planned_action = lru_cache(maxsize=PLANNED_ACTION_CACHE_MAX_ENTRIES)(parse_planned_action)
+
+
+def cached_parse_planned_action(result_str: str) -> Optional[PlannedAction]:
+    """parse_planned_action, servi depuis le cache pour les réponses identiques (prompts déterministes)"""
+    if len(result_str) <= PLANNED_ACTION_CACHE_MAX_CHARS:
+        return _cached_parse_planned_action(result_str)
+    return parse_planned_action(result_str)
@@ -0,0 +1,36 @@
+"""
+Réglages SQLite pour les scripts de chargement en masse (import CSV, seed)
+"""
+
+from sqlalchemy import event
+
+# PRAGMAs appliqués pendant les chargements: pas de fsync par commit,
+# tables temporaires et cache (256 Mo) en mémoire. Ils ne valent que pour la
+# connexion; pas de journal_mode=WAL, qui resterait inscrit dans le fichier de
+# la base de l'application (fichiers -wal/-shm ensuite)
+BULK_LOAD_PRAGMAS = (
+    'PRAGMA synchronous=OFF',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-262144',
+)
+
+
+def enable_bulk_load_pragmas(engine):
+    """
+    Applique BULK_LOAD_PRAGMAS à chaque nouvelle connexion SQLite du moteur
+
+    Args:
+        engine: Moteur SQLAlchemy (ignoré si ce n'est pas SQLite)
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_bulk_load_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in BULK_LOAD_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    # Les connexions déjà ouvertes dans le pool sont recréées avec les PRAGMAs
+    engine.dispose()
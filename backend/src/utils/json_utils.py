@@ -0,0 +1,32 @@
+"""
+Sérialisation JSON rapide (orjson si disponible, sinon module json standard)
+"""
+
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _default(value):
+    """Sérialise les dates comme orjson (ISO 8601)"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type {type(value).__name__} non sérialisable en JSON")
+
+
+def json_dumps(data) -> str:
+    """
+    Sérialise en JSON UTF-8 non échappé (équivalent de ensure_ascii=False)
+    
+    Les objets datetime/date sont acceptés directement.
+    """
+    if ORJSON_AVAILABLE:
+        # OPT_NON_STR_KEYS: clés non-str converties comme le fait json.dumps
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=_default)
@@ -0,0 +1,60 @@
+"""
+Comptage de mots-clés par catégorie (automate Aho-Corasick si pyahocorasick
+est disponible, sinon recherche de sous-chaînes)
+"""
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    ahocorasick = None
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordMatcher:
+    """
+    Compte, pour chaque catégorie, le nombre de mots-clés distincts présents
+    dans un texte (même résultat que `sum(1 for kw in keywords if kw in text.lower())`)
+
+    Avec pyahocorasick, tous les mots-clés sont cherchés en un seul passage
+    sur le texte (environ deux fois plus rapide). Sinon, le texte n'est mis
+    en minuscules qu'une fois et chaque mot-clé est cherché avec `in`
+    (recherche de sous-chaîne en C), plus rapide qu'une expression régulière
+    combinée. Les mots-clés sont en minuscules.
+    """
+
+    def __init__(self, keywords_by_category: dict):
+        self._keywords_by_category = {
+            category: tuple(keywords) for category, keywords in keywords_by_category.items()
+        }
+        self._automaton = self._build_automaton() if AHOCORASICK_AVAILABLE else None
+
+    def _build_automaton(self):
+        """Automate de tous les mots-clés; chacun porte les catégories où il figure"""
+        categories_by_keyword = {}
+        for category, keywords in self._keywords_by_category.items():
+            for keyword in keywords:
+                categories_by_keyword.setdefault(keyword, []).append(category)
+
+        automaton = ahocorasick.Automaton()
+        for keyword, categories in categories_by_keyword.items():
+            automaton.add_word(keyword, (keyword, tuple(categories)))
+        automaton.make_automaton()
+        return automaton
+
+    def scores(self, text: str) -> dict:
+        """Retourne {catégorie: nombre de mots-clés distincts trouvés dans text}"""
+        text = text.lower()
+        if self._automaton is None:
+            return {
+                category: sum(keyword in text for keyword in keywords)
+                for category, keywords in self._keywords_by_category.items()
+            }
+
+        # Un mot-clé trouvé plusieurs fois ne compte qu'une fois
+        found = {value for _, value in self._automaton.iter(text)}
+        scores = dict.fromkeys(self._keywords_by_category, 0)
+        for _, categories in found:
+            for category in categories:
+                scores[category] += 1
+        return scores
@@ -0,0 +1,56 @@
+"""
+Cache en mémoire des réponses des agents pour les demandes répétées à l'identique
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.json_utils import json_dumps
+
+
+def make_cache_key(*parts) -> str:
+    """Clé SHA-256 stable pour une combinaison de valeurs sérialisables en JSON"""
+    return hashlib.sha256(json_dumps(parts).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache LRU avec expiration, partagé entre les threads du serveur
+
+    Les entrées expirées sont ignorées à la lecture; au-delà de max_entries,
+    la moins récemment utilisée est retirée.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Retourne la valeur en cache, ou None si absente ou expirée"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        """Enregistre value pour ttl_seconds"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
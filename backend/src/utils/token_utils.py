@@ -0,0 +1,57 @@
+"""
+Comptage et troncature en tokens (tiktoken si disponible, sinon estimation
+à partir du nombre de caractères)
+"""
+
+from functools import lru_cache
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+# Encodage des modèles gpt-4o; estimation sans tiktoken: ~4 caractères par token
+DEFAULT_ENCODING = 'o200k_base'
+CHARS_PER_TOKEN = 4
+
+TRUNCATION_SUFFIX = "…"
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str = None):
+    """Encodage du modèle, chargé une seule fois (None si tiktoken est indisponible)"""
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(DEFAULT_ENCODING)
+        except KeyError:
+            # Modèle inconnu de tiktoken
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception:
+        # Fichier d'encodage introuvable (pas de réseau au premier chargement)
+        return None
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Nombre de tokens de text pour model"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    """Tronque text à max_tokens tokens, suivi de "…" s'il a été coupé"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= max_chars else text[:max_chars] + TRUNCATION_SUFFIX
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens]) + TRUNCATION_SUFFIX
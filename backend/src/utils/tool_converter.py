@@ -5,9 +5,13 @@ Modern LangChain 0.3.x + Pydantic v2 implementation
 
 from langchain_core.tools import BaseTool as LangChainBaseTool
 from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.runnables.config import run_in_executor
 from typing import Type, Any, Optional, Dict, Union
 from pydantic import BaseModel, Field
 import inspect
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class SageToLangChainToolWrapper(LangChainBaseTool):
@@ -53,8 +57,9 @@ class SageToLangChainToolWrapper(LangChainBaseTool):
         run_manager: Optional[CallbackManagerForToolRun] = None,
         **kwargs: Any
     ) -> str:
-        """Version async (fallback vers sync)"""
-        return self._run(run_manager=run_manager, **kwargs)
+        """Version async: l'outil synchrone tourne dans un thread, sans bloquer la boucle
+        (plusieurs outils demandés dans un même tour s'exécutent alors en parallèle)"""
+        return await run_in_executor(None, self._run, **kwargs)
 
 
 def convert_sage_tools_to_langchain(sage_tools: list) -> list:
@@ -73,12 +78,12 @@ def convert_sage_tools_to_langchain(sage_tools: list) -> list:
         try:
             wrapper = SageToLangChainToolWrapper(tool)
             langchain_tools.append(wrapper)
-            print(f"Converted tool: {wrapper.name}")
+            logger.debug("Converted tool: %s", wrapper.name)
         except Exception as e:
-            print(f"Failed to convert tool {getattr(tool, 'name', 'unknown')}: {e}")
+            logger.warning("Failed to convert tool %s: %s", getattr(tool, 'name', 'unknown'), e)
             continue
     
-    print(f"Converted {len(langchain_tools)}/{len(sage_tools)} tools successfully")
+    logger.info("Converted %s/%s tools successfully", len(langchain_tools), len(sage_tools))
     return langchain_tools
 
 # Backward compatibility alias
@@ -117,6 +122,6 @@ def create_langchain_tool_from_function(func, name: str, description: str):
             run_manager: Optional[CallbackManagerForToolRun] = None,
             **kwargs: Any
         ) -> str:
-            return self._run(run_manager=run_manager, **kwargs)
+            return await run_in_executor(None, self._run, **kwargs)
     
     return FunctionTool()
\ No newline at end of file
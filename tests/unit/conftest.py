@@ -0,0 +1,40 @@
+"""
+Outils communs aux tests unitaires du backend
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def load_backend_module(relative_path, optional_dependency=None, available=True):
+    """
+    Charge un module du backend dans un objet module neuf
+
+    Avec available=False, optional_dependency est masquée pendant l'import
+    (ImportError): le module prend alors son chemin de repli.
+    """
+    if available and optional_dependency and importlib.util.find_spec(optional_dependency) is None:
+        pytest.skip(f"{optional_dependency} non installé")
+
+    path = os.path.join(BACKEND_DIR, relative_path)
+    name = f"{os.path.splitext(os.path.basename(path))[0]}_{optional_dependency}_{available}"
+    saved = sys.modules.get(optional_dependency) if optional_dependency else None
+    if optional_dependency and not available:
+        sys.modules[optional_dependency] = None
+    try:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        if optional_dependency and not available:
+            if saved is None:
+                del sys.modules[optional_dependency]
+            else:
+                sys.modules[optional_dependency] = saved
+    return module
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Analyse des actions planifiées (src/utils/action_parser.py), avec re et avec re2
+"""
+
+import pytest
+
+from conftest import load_backend_module
+
+
+@pytest.fixture(params=[False, True], ids=['re', 're2'])
+def parser(request):
+    module = load_backend_module('src/utils/action_parser.py', 're2', available=request.param)
+    assert module.RE2_AVAILABLE is request.param
+    return module
+
+
+def test_response_without_marker(parser):
+    assert parser.parse_planned_action("Voici la liste de vos clients.") is None
+    assert parser.cached_parse_planned_action("Voici la liste de vos clients.") is None
+
+
+def test_response_with_marker(parser):
+    response = (
+        "Création en préparation.\n"
+        "Client: Société Atlas\n"
+        "PLANNED_ACTION: [type:create_client] [description:Créer le client Société Atlas]"
+    )
+    action = parser.parse_planned_action(response)
+
+    assert action == parser.PlannedAction(
+        response="Création en préparation.\nClient: Société Atlas",
+        action_type='create_client',
+        description='Créer le client Société Atlas',
+        details=(('client_name', 'Société Atlas'),),
+    )
+    assert parser.cached_parse_planned_action(response) == action
+
+
+def test_malformed_first_marker(parser):
+    # Le premier marqueur est incomplet: l'action vient du suivant, la réponse
+    # principale s'arrête au premier marqueur
+    response = (
+        "Analyse terminée.\n"
+        "PLANNED_ACTION: incomplet\n"
+        "PLANNED_ACTION: [type:get_customers] [description:Lister les clients]"
+    )
+    action = parser.parse_planned_action(response)
+
+    assert action.response == "Analyse terminée."
+    assert action.action_type == 'get_customers'
+    assert action.description == 'Lister les clients'
+    assert action.details == ()
+
+
+def test_malformed_marker_only(parser):
+    assert parser.parse_planned_action("PLANNED_ACTION: [type:create_invoice]") is None
+
+
+@pytest.mark.parametrize('amount_text', ['200,50 €', '200,50\u00a0€', '200,50\u202f€', '200,50€'])
+def test_invoice_amount_with_any_space(parser, amount_text):
+    details = parser.extract_action_details(f"Facture de {amount_text} pour Atlas", 'create_invoice')
+    assert details == {'amount': '200,50', 'client_name': 'Atlas'}
+
+
+def test_product_price_with_non_breaking_space(parser):
+    details = parser.extract_action_details("Produit: Conseil\nPrix: 1500,00\u00a0€", 'create_product')
+    assert details == {'product_name': 'Conseil', 'price': '1500,00'}
+
+
+def test_keywords_match_whatever_the_case(parser):
+    details = parser.extract_action_details("CLİENT: Société Atlas", 'create_client')
+    assert details == {'client_name': 'Société Atlas'}
+    # La valeur est lue dans le texte d'origine, casse comprise
+    details = parser.extract_action_details("NOM : ÉPICERIE Centrale", 'create_client')
+    assert details == {'client_name': 'ÉPICERIE Centrale'}
+
+
+def test_line_capture_is_bounded(parser):
+    details = parser.extract_action_details("Client: " + "x" * 200 + "\nsuite", 'create_client')
+    assert details == {'client_name': "x" * parser.DETAIL_LINE_MAX_CHARS}
+
+
+def test_word_capture_is_bounded(parser):
+    details = parser.extract_action_details("Facture pour jean paul dupont maroc casablanca", 'create_invoice')
+    assert details == {'client_name': 'jean paul dupont maroc'}
+
+
+@pytest.mark.parametrize('line_break', ['\n', '\r\n'])
+def test_word_capture_stays_on_its_line(parser, line_break):
+    details = parser.extract_action_details(f"… une facture pour jean{line_break}dupont maroc", 'create_invoice')
+    assert details == {'client_name': 'jean'}
+
+
+def test_action_type_without_details(parser):
+    assert parser.extract_action_details("Client: Atlas, 200 €", 'get_balance_sheet') == {}
+
+
+def test_lone_surrogate(parser):
+    details = parser.extract_action_details("Client: Atlas\ud800", 'create_client')
+    assert details['client_name'].startswith('Atlas')
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Exécution d'une action confirmée: les outils Sage doivent recevoir les
+credentials de l'utilisateur dans le thread de la requête (hors de la tâche
+de l'agent, où ils sont normalement installés)
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'backend'))
+
+flask = pytest.importorskip('flask')
+pytest.importorskip('flask_sqlalchemy')
+pytest.importorskip('flask_jwt_extended')
+pytest.importorskip('langchain')
+pytest.importorskip('langchain_openai')
+
+from src.models.user import db, User  # noqa: E402
+from src.routes import ai_agent  # noqa: E402
+from src.tools.sage_tools import get_user_credentials  # noqa: E402
+
+SAGE_CREDENTIALS = {'access_token': 'token-utilisateur', 'business_id': 'business-utilisateur'}
+
+
+class FakeGetCustomersTool:
+    """Outil get_customers qui ne fait que lire les credentials du contexte courant"""
+    name = 'get_customers'
+
+    def __init__(self, result=None):
+        self.result = result
+
+    def _run(self, **kwargs):
+        credentials = get_user_credentials()
+        if not credentials:
+            return "❌ Erreur: Aucune connexion Sage détectée. Veuillez vous connecter à Sage d'abord."
+        return self.result or f"Clients de {credentials['business_id']}"
+
+
+@pytest.fixture
+def app_and_user():
+    app = flask.Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(username='comptable', email='comptable@example.com', password_hash='x')
+        user.set_sage_credentials(SAGE_CREDENTIALS)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    yield app, user_id
+    with app.app_context():
+        db.drop_all()
+
+
+def run_confirmed_action(app, user_id, action_type):
+    """execute_real_sage_action dans un nouveau thread (contexte vide) et un nouveau contexte de requête"""
+    outcome = {}
+
+    def target():
+        with app.test_request_context():
+            outcome['result'] = ai_agent.execute_real_sage_action(
+                user_id, action_type, {'type': action_type, 'description': '', 'details': {}}
+            )
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    return outcome['result']
+
+
+def test_confirmed_action_uses_user_credentials(app_and_user, monkeypatch):
+    app, user_id = app_and_user
+    monkeypatch.setattr(ai_agent, 'SAGE_TOOLS', [FakeGetCustomersTool()])
+
+    assert run_confirmed_action(app, user_id, 'get_customers') == (True, 'Clients de business-utilisateur')
+
+
+def test_tool_error_is_reported_as_failure(app_and_user, monkeypatch):
+    app, user_id = app_and_user
+    error = "❌ Erreur lors de la récupération des clients: 401"
+    monkeypatch.setattr(ai_agent, 'SAGE_TOOLS', [FakeGetCustomersTool(result=error)])
+
+    assert run_confirmed_action(app, user_id, 'get_customers') == (False, error)
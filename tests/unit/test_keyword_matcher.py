@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Comptage de mots-clés (src/utils/keyword_matcher.py), avec et sans pyahocorasick
+"""
+
+import pytest
+
+from conftest import load_backend_module
+
+KEYWORDS = {
+    'comptable': ('client', 'facture', 'créer', 'import'),
+    'analyste': ('bilan', 'analyse', 'chiffre d\'affaires', 'client'),
+    'support': ('aide', 'ne fonctionne pas'),
+}
+
+
+@pytest.fixture(params=[False, True], ids=['substring', 'ahocorasick'])
+def keyword_matcher(request):
+    module = load_backend_module('src/utils/keyword_matcher.py', 'ahocorasick', available=request.param)
+    assert module.AHOCORASICK_AVAILABLE is request.param
+    return module
+
+
+@pytest.mark.parametrize('text', [
+    "",
+    "Créer une FACTURE pour le client Atlas",
+    "Analyse du bilan: chiffre d'affaires par client, client, client",
+    "L'import ne fonctionne pas, aide!",
+    "importer les clients",
+])
+def test_scores_match_substring_count(keyword_matcher, text):
+    expected = {
+        category: sum(1 for keyword in keywords if keyword in text.lower())
+        for category, keywords in KEYWORDS.items()
+    }
+    assert keyword_matcher.KeywordMatcher(KEYWORDS).scores(text) == expected
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Cache des réponses des agents (src/utils/response_cache.py)
+"""
+
+from datetime import date
+
+from src.utils import response_cache
+from src.utils.response_cache import ResponseCache, make_cache_key
+
+
+def test_make_cache_key_is_stable():
+    key = make_cache_key(1, ['comptable'], True, "Liste des clients", [{'date': date(2025, 5, 1)}])
+    assert key == make_cache_key(1, ['comptable'], True, "Liste des clients", [{'date': date(2025, 5, 1)}])
+    assert key != make_cache_key(2, ['comptable'], True, "Liste des clients", [{'date': date(2025, 5, 1)}])
+    assert len(key) == 64
+
+
+def test_get_returns_value_until_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl_seconds=60, max_entries=10)
+
+    assert cache.get('a') is None
+    cache.set('a', 'réponse')
+    now[0] += 59
+    assert cache.get('a') == 'réponse'
+    now[0] += 1
+    assert cache.get('a') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' devient la moins récemment utilisée
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+    cache.clear()
+    assert cache.get('a') is None